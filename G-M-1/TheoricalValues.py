@@ -1,20 +1,12 @@
-import numpy as np
-from scipy.optimize import fsolve
+import math
 
-def gm1_theoretical_hyperexp(lambda_val, mu=1.0, p=0.05278640450004202):
-    """Compute theoretical metrics for G/M/1 queue with hyperexponential interarrivals."""
-    # Compute lambda1, lambda2 for hyperexponential distribution
-    x = 1 / lambda_val  # Mean interarrival time
-    z = 9.0  # cv^2 = 9
-    p = 0.5 * (1 - np.sqrt((z - 1) / (z + 1)))
-    z1 = x / p
-    z2 = x / (1 - p)
-    lambda1 = 2 / z1
-    lambda2 = 2 / z2
-
-    # Laplace-Stieltjes transform
-    def laplace_transform(s):
-        return (p * lambda1 / (lambda1 + s)) + ((1 - p) * lambda2 / (lambda2 + s))
+def gm1_theoretical(lambda_val, mu, laplace_transform):
+    """
+    Compute theoretical metrics for G/M/1 queue with any interarrival distribution.
+    laplace_transform: Laplace-Stieltjes transform s -> E[exp(-s A)] of the interarrival
+    time A (whose mean must be 1/lambda_val)
+    """
+    from scipy.optimize import fsolve  # imported here: scipy is slow to import
 
     # Equation for sigma
     def sigma_equation(sigma):
@@ -42,15 +34,40 @@ def gm1_theoretical_hyperexp(lambda_val, mu=1.0, p=0.05278640450004202):
         "avg_queue_length": avg_queue_length
     }
 
-# Example usage
-lambda_val = 0.5
-mu = 1.0
+def gm1_theoretical_hyperexp(lambda_val, mu=1.0, p=None, cv_squared=9.0):
+    """
+    Compute theoretical metrics for G/M/1 queue with hyperexponential interarrivals.
+    cv_squared: squared coefficient of variation of the interarrival times
+    p: probability of the short stage of Morse's H2, derived from cv_squared if not given
+    """
+    if p is None:
+        if cv_squared < 1:
+            raise ValueError("cv_squared must be at least 1 for a hyperexponential distribution")
+        p = 0.5 * (1 - math.sqrt((cv_squared - 1) / (cv_squared + 1)))
+
+    # Compute lambda1, lambda2 for hyperexponential distribution
+    x = 1 / lambda_val  # Mean interarrival time
+    z1 = x / p
+    z2 = x / (1 - p)
+    lambda1 = 2 / z1
+    lambda2 = 2 / z2
+
+    # Laplace-Stieltjes transform
+    def laplace_transform(s):
+        return (p * lambda1 / (lambda1 + s)) + ((1 - p) * lambda2 / (lambda2 + s))
 
-# Compute metrics
-results = gm1_theoretical_hyperexp(lambda_val, mu)
+    return gm1_theoretical(lambda_val, mu, laplace_transform)
+
+if __name__ == "__main__":
+    # Example usage
+    lambda_val = 0.5
+    mu = 1.0
+
+    # Compute metrics
+    results = gm1_theoretical_hyperexp(lambda_val, mu)
 
-# Display results
-print(f"Average wait time : {results['avg_wait_time']:.4f}")
-print(f"Average queue length : {results['avg_queue_length']:.4f}")
-print(f"Server utilization : {results['utilization']:.4f}")
-print(f"Average response time : {results['avg_response_time']:.4f}")
\ No newline at end of file
+    # Display results
+    print(f"Average wait time : {results['avg_wait_time']:.4f}")
+    print(f"Average queue length : {results['avg_queue_length']:.4f}")
+    print(f"Server utilization : {results['utilization']:.4f}")
+    print(f"Average response time : {results['avg_response_time']:.4f}")
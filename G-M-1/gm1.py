@@ -169,16 +169,46 @@ Donc quand λ augmente, tu as plus d’observations dans le même intervalle de
 '''
 
 
+import argparse
+import csv
+import functools
 import random
 import math
 import heapq
 import statistics
-import numpy as np
-import pandas as pd
+import os
+import sys
+import time
+
+# Structures shared by the three simulators, in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from event_tools import BatchCounter, BatchMeans, RingBuffer, RunningStatistics, blocking_probability
 
 def exp_rv(beta):
     return -beta * math.log(random.random())
 
+@functools.lru_cache(maxsize=None)
+def hyperx_parameters(x, cv_squared):
+    """
+    Parameters of Morse's two-stage hyperexponential distribution, computed once per parameter set.
+    x: mean
+    cv_squared: squared coefficient of variation (at least 1)
+    Returns: (p, scale of the stage chosen with probability p, scale of the other stage)
+    """
+    if cv_squared < 1:
+        raise ValueError("hyperx Error: cv_squared must be at least 1")
+
+    p = 0.5 * (1.0 - math.sqrt((cv_squared - 1.0) / (cv_squared + 1.0)))
+    return p, 0.5 * x / p, 0.5 * x / (1.0 - p)
+
+def hyperx_variate(p, scale_p, scale_q):
+    """Generate a hyperexponential random variate from the output of hyperx_parameters."""
+    if random.random() > p:
+        return -scale_q * math.log(random.random())
+    return -scale_p * math.log(random.random())
+
 def hyperx(x, s):
     """
     Generate a random variate from Morse's two-stage hyperexponential distribution
@@ -188,35 +218,36 @@ def hyperx(x, s):
     """
     if s <= x:
         raise ValueError("hyperx Error: s must be greater than x")
-    
+
     cv = s / x  # coefficient of variation
-    z = cv * cv
-    p = 0.5 * (1.0 - math.sqrt((z - 1.0) / (z + 1.0)))
-    
-    # Select which exponential to use
-    if random.random() > p:
-        z = x / (1.0 - p)
-    else:
-        z = x / p
-        
-    return -0.5 * z * math.log(random.random())
+    return hyperx_variate(*hyperx_parameters(x, cv * cv))
 
-def generate_arrival_times(lambda_value, num_arrivals):
+def generate_arrival_times(lambda_value, num_arrivals, cv_squared=9.0):
     """
     Generate arrival times using Morse's hyperexponential distribution
     lambda_value: mean arrival rate
+    cv_squared: squared coefficient of variation of the interarrival times
     """
     arrival_times = []
     current_time = 0.0
     mean = 1/lambda_value  # mean interarrival time
-    std = 3 * mean        # standard deviation (cv^2 = 9)
-    
+    p, scale_p, scale_q = hyperx_parameters(mean, cv_squared)
+    variate = hyperx_variate
+
     for _ in range(num_arrivals):
-        inter_arrival_time = hyperx(mean, std)
+        inter_arrival_time = variate(p, scale_p, scale_q)
         current_time += inter_arrival_time
         arrival_times.append(current_time)
     return arrival_times
 
+def iter_arrival_times(lambda_value, num_arrivals, cv_squared=9.0):
+    """Same arrival times as generate_arrival_times, drawn one at a time instead of stored in a list."""
+    p, scale_p, scale_q = hyperx_parameters(1/lambda_value, cv_squared)
+    current_time = 0.0
+    for _ in range(num_arrivals):
+        current_time += hyperx_variate(p, scale_p, scale_q)
+        yield current_time
+
 def confidence_interval(data, confidence=0.95):
     n = len(data)
     mean = statistics.mean(data)
@@ -228,12 +259,63 @@ def confidence_interval(data, confidence=0.95):
         margin = 0.0
     return mean, margin
 
-def run_simulation(lambda_value, service_rate=1.0, num_customers=1000000):
+def _timed(function, timings, phase):
+    """Wrap function so that its running time is added to timings[phase]."""
+    perf_counter = time.perf_counter
+    def wrapper(*args):
+        start = perf_counter()
+        result = function(*args)
+        timings[phase] += perf_counter() - start
+        return result
+    return wrapper
+
+def run_simulation(lambda_value, service_rate=1.0, num_customers=1000000, profile=False, cv_squared=9.0, capacity=None, gradients=False):
     """
     Run a single G/M/1 queue simulation with hyperexponential arrivals
+    cv_squared: squared coefficient of variation of the interarrival times
+    profile: if True, the wall time is split into phases (variate generation, event list,
+    queue operations, statistics bookkeeping) and returned under the "profile" key.
+    capacity: maximum number of customers in the system (K of G/G/1/K), None for an
+    infinite queue. Arrivals finding the system full are blocked and lost; num_customers
+    then counts the arriving customers, served or blocked.
+    gradients: if True, the derivatives of the average wait and response times with
+    respect to λ and μ are estimated from the same run by infinitesimal perturbation
+    analysis (IPA), with batch-means margins (infinite queue only).
     """
+    start_time = time.perf_counter()
+
+    # Check system stability (a finite queue is always stable)
+    utilization = lambda_value / service_rate
+    if capacity is None and utilization >= 1:
+        raise ValueError(f"Unstable system: λ={lambda_value}, μ={service_rate}, ρ={utilization}")
+    if capacity is not None and capacity < 1:
+        raise ValueError(f"The capacity must be at least 1 (got {capacity})")
+    if gradients and capacity is not None:
+        raise ValueError("IPA gradients need an infinite queue (blocking makes them biased)")
+
+    # Hot-path operations, wrapped with timers only when profiling
+    timings = {"variates": 0.0, "event_list": 0.0, "queue": 0.0}
+    # A finite queue draws its arrivals on the fly, so that its memory does not grow with num_customers
+    make_arrival_times = generate_arrival_times if capacity is None else iter_arrival_times
+    next_arrival_time = next
+    sample_service = exp_rv
+    push = heapq.heappush
+    pop = heapq.heappop
+    queue = [] if capacity is None else RingBuffer(capacity - 1)
+    waiting_room = math.inf if capacity is None else capacity - 1
+    enqueue = queue.append
+    dequeue = queue.pop
+    if profile:
+        make_arrival_times = _timed(make_arrival_times, timings, "variates")
+        next_arrival_time = _timed(next_arrival_time, timings, "variates")
+        sample_service = _timed(sample_service, timings, "variates")
+        push = _timed(push, timings, "event_list")
+        pop = _timed(pop, timings, "event_list")
+        enqueue = _timed(enqueue, timings, "queue")
+        dequeue = _timed(dequeue, timings, "queue")
+
     # Generate arrival times
-    arrival_times = generate_arrival_times(lambda_value, num_customers)
+    arrival_times = iter(make_arrival_times(lambda_value, num_customers, cv_squared))
 
     # Events
     ARRIVAL = 1
@@ -241,70 +323,95 @@ def run_simulation(lambda_value, service_rate=1.0, num_customers=1000000):
 
     # State variables
     current_time = 0.0
-    queue = []
     server_busy = False
     event_list = []
     last_event_time = 0.0
-    next_arrival_index = 0
+    num_arrivals = 1
     num_customers_served = 0
+    num_blocked = 0
+    blocked_arrivals = None if capacity is None else BatchCounter(num_customers)
     area_queue = 0.0
     area_busy = 0.0
-    wait_times = []
-    response_times = []
-    queue_lengths = []
-    utilizations = []
+    wait_times = RunningStatistics()
+    response_times = RunningStatistics()
+
+    # IPA: interarrival times scale with 1/λ and service times with 1/μ, so an arrival
+    # time T has dT/dλ = -T/λ and a service time S has dS/dμ = -S/μ. The derivatives
+    # of the departure time of the customer in service are carried along.
+    departure_dlambda = 0.0
+    departure_dmu = 0.0
+    wait_dlambda = BatchMeans(num_customers)
+    wait_dmu = BatchMeans(num_customers)
+    response_dmu = BatchMeans(num_customers)
+    service_mean = 1 / service_rate
 
     # Schedule first arrival
-    heapq.heappush(event_list, (arrival_times[next_arrival_index], ARRIVAL))
+    push(event_list, (next_arrival_time(arrival_times), ARRIVAL))
 
     # Main simulation loop
-    while num_customers_served < num_customers and event_list:
-        event_time, event_type = heapq.heappop(event_list)
+    while num_customers_served + num_blocked < num_customers and event_list:
+        event_time, event_type = pop(event_list)
         time_since_last = event_time - last_event_time
         area_queue += len(queue) * time_since_last
         area_busy += (1 if server_busy else 0) * time_since_last
-        queue_lengths.append(len(queue))
-        utilizations.append(1 if server_busy else 0)
         last_event_time = event_time
         current_time = event_time
 
         if event_type == ARRIVAL:
             if not server_busy:
                 server_busy = True
-                service_time = exp_rv(1 / service_rate)
+                service_time = sample_service(service_mean)
                 response_times.append(service_time)
                 wait_times.append(0.0)
-                heapq.heappush(event_list, (current_time + service_time, DEPARTURE))
+                push(event_list, (current_time + service_time, DEPARTURE))
+                if gradients:
+                    departure_dlambda = -current_time / lambda_value
+                    departure_dmu = -service_time / service_rate
+                    wait_dlambda.append(0.0)
+                    wait_dmu.append(0.0)
+                    response_dmu.append(departure_dmu)
+            elif len(queue) < waiting_room:
+                enqueue(current_time)
             else:
-                queue.append(current_time)
+                # Full system: the customer is blocked and lost
+                blocked_arrivals.append(num_arrivals - 1)
+                num_blocked += 1
 
             # Schedule next arrival
-            if num_customers_served + len(queue) + (1 if server_busy else 0) < num_customers:
-                next_arrival_index += 1
-                if next_arrival_index < len(arrival_times):
-                    next_arrival = arrival_times[next_arrival_index]
-                    heapq.heappush(event_list, (next_arrival, ARRIVAL))
+            if num_customers_served + num_blocked + len(queue) + (1 if server_busy else 0) < num_customers:
+                next_arrival = next_arrival_time(arrival_times, None)
+                if next_arrival is not None:
+                    num_arrivals += 1
+                    push(event_list, (next_arrival, ARRIVAL))
 
         elif event_type == DEPARTURE:
             num_customers_served += 1
             if queue:
-                arrival_time = queue.pop(0)
+                arrival_time = dequeue(0)
                 wait_time = current_time - arrival_time
-                service_time = exp_rv(1 / service_rate)
+                service_time = sample_service(service_mean)
                 wait_times.append(wait_time)
                 response_times.append(wait_time + service_time)
-                heapq.heappush(event_list, (current_time + service_time, DEPARTURE))
+                push(event_list, (current_time + service_time, DEPARTURE))
+                if gradients:
+                    # The service starts at the previous departure
+                    wait_dlambda.append(departure_dlambda + arrival_time / lambda_value)
+                    wait_dmu.append(departure_dmu)
+                    departure_dmu -= service_time / service_rate
+                    response_dmu.append(departure_dmu)
             else:
                 server_busy = False
 
     # Compute final metrics
     time_total = current_time
-    avg_wait, wait_margin = confidence_interval(wait_times)
-    avg_response, response_margin = confidence_interval(response_times)
+    avg_wait, wait_margin = wait_times.interval()
+    avg_response, response_margin = response_times.interval()
     avg_queue_length = area_queue / time_total
     avg_utilization = area_busy / time_total
 
-    return {
+    results = {
+        "num_customers_served": num_customers_served,
+        "time_total": time_total,
         "avg_wait": avg_wait,
         "wait_margin": wait_margin,
         "avg_response": avg_response,
@@ -312,41 +419,99 @@ def run_simulation(lambda_value, service_rate=1.0, num_customers=1000000):
         "avg_queue_length": avg_queue_length,
         "avg_utilization": avg_utilization
     }
-
-# Parameters
-lambda_value = 0.9
-service_rate = 1.0
-num_runs = 5
-num_customers = 1000000
-
-# Run simulations and collect results
-results = []
-for _ in range(num_runs):
-    results.append(run_simulation(lambda_value, service_rate, num_customers))
-
-# Compute averages for the metrics
-avg_wait = statistics.mean([r['avg_wait'] for r in results])
-avg_response = statistics.mean([r['avg_response'] for r in results])
-avg_queue_length = statistics.mean([r['avg_queue_length'] for r in results])
-avg_utilization = statistics.mean([r['avg_utilization'] for r in results])
-
-# Prepare data for CSV
-output_data = {
-    "lambda": [lambda_value],
-    "avg_wait_time": [avg_wait],
-    "avg_queue_length": [avg_queue_length],
-    "avg_utilization": [avg_utilization],
-    "avg_response_time": [avg_response]
-}
-
-# Save to CSV
-df = pd.DataFrame(output_data)
-df.to_csv("gm1_simulation_results.csv", index=False)
-print("Simulation results saved to gm1_simulation_results.csv")
-
-# Display results
-print(f"\nSimulation Results for λ={lambda_value}, μ={service_rate}")
-print(f"Average wait time: {avg_wait:.4f}")
-print(f"Average queue length: {avg_queue_length:.4f}")
-print(f"Server utilization: {avg_utilization:.4f}")
-print(f"Average response time: {avg_response:.4f}")
\ No newline at end of file
+    if capacity is not None:
+        blocking, blocking_margin = blocking_probability(blocked_arrivals, num_customers_served + num_blocked)
+        results.update({
+            "capacity": capacity,
+            "num_blocked": num_blocked,
+            "blocking_probability": blocking,
+            "blocking_margin": blocking_margin
+        })
+    if gradients:
+        dwait_dlambda, dwait_dlambda_margin = wait_dlambda.interval()
+        dwait_dmu, dwait_dmu_margin = wait_dmu.interval()
+        dresponse_dmu, dresponse_dmu_margin = response_dmu.interval()
+        results.update({
+            "dwait_dlambda": dwait_dlambda,
+            "dwait_dlambda_margin": dwait_dlambda_margin,
+            "dwait_dmu": dwait_dmu,
+            "dwait_dmu_margin": dwait_dmu_margin,
+            "dresponse_dlambda": dwait_dlambda,  # service times do not depend on λ
+            "dresponse_dlambda_margin": dwait_dlambda_margin,
+            "dresponse_dmu": dresponse_dmu,
+            "dresponse_dmu_margin": dresponse_dmu_margin
+        })
+    if profile:
+        # Statistics bookkeeping is everything that is not timed explicitly
+        total = time.perf_counter() - start_time
+        timings["statistics"] = total - sum(timings.values())
+        timings["total"] = total
+        results["profile"] = timings
+    return results
+
+def main(argv=None):
+    """Command-line entry point: simulate a grid of arrival rates and save the averages to CSV."""
+    parser = argparse.ArgumentParser(description="G/M/1 queue simulation (hyperexponential arrivals, exponential service).")
+    parser.add_argument("--lambdas", nargs="+", type=float, default=[0.9], help="arrival rates λ to simulate")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--customers", type=int, default=1000000, help="number of customers per run")
+    parser.add_argument("--runs", type=int, default=5, help="independent runs per λ")
+    parser.add_argument("--cv2", type=float, default=9.0, help="squared coefficient of variation of the interarrival times")
+    parser.add_argument("--capacity", type=int, default=None, help="system capacity K (arrivals beyond are blocked)")
+    parser.add_argument("--gradients", action="store_true", help="estimate dW/dλ and dW/dμ by IPA")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--output", default="gm1_simulation_results.csv", help="CSV file for the results")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    service_rate = args.mu
+
+    rows = []
+    for lambda_value in args.lambdas:
+        # Run simulations and collect results
+        results = []
+        for _ in range(args.runs):
+            results.append(run_simulation(lambda_value, service_rate, args.customers, cv_squared=args.cv2,
+                                          capacity=args.capacity, gradients=args.gradients))
+
+        # Compute averages for the metrics
+        avg_wait = statistics.mean([r['avg_wait'] for r in results])
+        avg_response = statistics.mean([r['avg_response'] for r in results])
+        avg_queue_length = statistics.mean([r['avg_queue_length'] for r in results])
+        avg_utilization = statistics.mean([r['avg_utilization'] for r in results])
+
+        rows.append({
+            "lambda": lambda_value,
+            "avg_wait_time": avg_wait,
+            "avg_queue_length": avg_queue_length,
+            "avg_utilization": avg_utilization,
+            "avg_response_time": avg_response
+        })
+
+        # Display results
+        print(f"\nSimulation Results for (λ={lambda_value}, μ={service_rate})")
+        print(f"Average wait time: {avg_wait:.4f}")
+        print(f"Average queue length: {avg_queue_length:.4f}")
+        print(f"Server utilization: {avg_utilization:.4f}")
+        print(f"Average response time: {avg_response:.4f}")
+        if args.capacity is not None:
+            blocking = statistics.mean([r['blocking_probability'] for r in results])
+            rows[-1]["blocking_probability"] = blocking
+            print(f"Blocking probability: {blocking:.4f}")
+        if args.gradients:
+            dwait_dlambda = statistics.mean([r['dwait_dlambda'] for r in results])
+            dwait_dmu = statistics.mean([r['dwait_dmu'] for r in results])
+            print(f"dW/dλ: {dwait_dlambda:.4f}")
+            print(f"dW/dμ: {dwait_dmu:.4f}")
+            print(f"Wait change for μ +5% (first order): {0.05 * service_rate * dwait_dmu:+.4f}")
+
+    # Save to CSV
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Simulation results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
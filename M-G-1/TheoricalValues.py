@@ -1,5 +1,3 @@
-import numpy as np
-
 def mg1_theoretical(lambda_value, mu=1.0, cv_squared=9.0):
     """
     Compute theoretical metrics for M/G/1 queue with hyperexponential service times.
@@ -31,16 +29,17 @@ def mg1_theoretical(lambda_value, mu=1.0, cv_squared=9.0):
         "avg_response_time": avg_response_time
     }
 
-# Parameters
-lambda_value = 0.5
-service_rate = 1.0
-cv_squared = 9.0
+if __name__ == "__main__":
+    # Parameters
+    lambda_value = 0.5
+    service_rate = 1.0
+    cv_squared = 9.0
 
-# Compute theoretical results
-results = mg1_theoretical(lambda_value, service_rate, cv_squared)
+    # Compute theoretical results
+    results = mg1_theoretical(lambda_value, service_rate, cv_squared)
 
-# Display results
-print(f"Average wait time : {results['avg_wait_time']:.4f}")
-print(f"Average queue length : {results['avg_queue_length']:.4f}")
-print(f"Server utilization : {results['utilization']:.4f}")
-print(f"Average response time : {results['avg_response_time']:.4f}")
\ No newline at end of file
+    # Display results
+    print(f"Average wait time : {results['avg_wait_time']:.4f}")
+    print(f"Average queue length : {results['avg_queue_length']:.4f}")
+    print(f"Server utilization : {results['utilization']:.4f}")
+    print(f"Average response time : {results['avg_response_time']:.4f}")
@@ -7,7 +7,7 @@ def mm1_queue(lambda_rate, mu_rate):
     mu_rate (μ)     : taux de service (services par unité de temps)
 
     Retour :
-    None (affiche les métriques de performance)
+    dict des métriques de performance (mêmes clés que mg1_theoretical / gm1_theoretical_hyperexp)
     """
     if lambda_rate >= mu_rate:
         raise ValueError("Le système est instable (λ doit être strictement inférieur à μ).")
@@ -21,13 +21,22 @@ def mm1_queue(lambda_rate, mu_rate):
     avg_response_time = 1 / (mu_rate - lambda_rate)  # W = Wq + 1/μ
     avg_system_length = lambda_rate * avg_response_time  # L = λW
 
-    print(f"Average wait time : {avg_wait_time:.4f}")
-    print(f"Average queue length :  {avg_queue_length:.4f}")
-    print(f"Server utilization: {utilization:.4f}")
-    print(f"Average response time: {avg_response_time:.4f}")
-    
-# Exemple d'utilisation
-λ = 0.1  # taux d'arrivée
-μ = 1.0  # taux de service
+    return {
+        "avg_wait_time": avg_wait_time,
+        "avg_queue_length": avg_queue_length,
+        "utilization": utilization,
+        "avg_response_time": avg_response_time,
+        "avg_system_length": avg_system_length
+    }
+
+if __name__ == "__main__":
+    # Exemple d'utilisation
+    λ = 0.1  # taux d'arrivée
+    μ = 1.0  # taux de service
+
+    results = mm1_queue(λ, μ)
+    print(f"Average wait time : {results['avg_wait_time']:.4f}")
+    print(f"Average queue length :  {results['avg_queue_length']:.4f}")
+    print(f"Server utilization: {results['utilization']:.4f}")
+    print(f"Average response time: {results['avg_response_time']:.4f}")
 
-mm1_queue(λ, μ)
@@ -1,7 +1,18 @@
+import argparse
+import csv
 import random
 import math
 import heapq
 import statistics
+import os
+import sys
+import time
+
+# Structures shared by the three simulators, in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from event_tools import BatchCounter, BatchMeans, RingBuffer, RunningStatistics, blocking_probability
 
 def exp_rv(beta):
     return -beta * math.log(random.random())
@@ -9,94 +20,259 @@ def exp_rv(beta):
 def confidence_interval(data, confidence=0.95):
     n = len(data)
     mean = statistics.mean(data)
-    stddev = statistics.stdev(data)
-    z = 1.96  # for 95% confidence
-    margin = z * (stddev / math.sqrt(n))
-    return mean, (mean - margin, mean + margin)
-
-# Parameters
-arrival_rate = 0.2  # lambda
-service_rate = 1.0  # mu
-beta = 1 / arrival_rate
-NUM_CUSTOMERS = 1000000
-
-# Events
-ARRIVAL = 1
-DEPARTURE = 2
-
-# State variables
-current_time = 0.0
-queue = []
-server_busy = False
-event_list = []
-last_event_time = 0.0
-
-# Statistics
-num_customers_served = 0
-area_queue = 0.0
-area_busy = 0.0
-
-# Individual observations
-wait_times = []
-response_times = []
-queue_lengths = []
-utilizations = []
-
-# Schedule the first arrival
-heapq.heappush(event_list, (exp_rv(beta), ARRIVAL))
-
-# Main simulation loop
-while num_customers_served < NUM_CUSTOMERS:
-    event_time, event_type = heapq.heappop(event_list)
-    time_since_last = event_time - last_event_time
-    area_queue += len(queue) * time_since_last
-    area_busy += (1 if server_busy else 0) * time_since_last
-    queue_lengths.append(len(queue))
-    utilizations.append(1 if server_busy else 0)
-    last_event_time = event_time
-    current_time = event_time
-
-    if event_type == ARRIVAL:
-        if not server_busy:
-            server_busy = True
-            service_time = exp_rv(1/service_rate)
-            response_times.append(service_time)  # No wait time
-            wait_times.append(0.0)
-            heapq.heappush(event_list, (current_time + service_time, DEPARTURE))
-        else:
-            queue.append(current_time)
-
-        if num_customers_served + len(queue) + (1 if server_busy else 0) < NUM_CUSTOMERS:
-            next_arrival = current_time + exp_rv(beta)
-            heapq.heappush(event_list, (next_arrival, ARRIVAL))
-
-    elif event_type == DEPARTURE:
-        num_customers_served += 1
-        if queue:
-            arrival_time = queue.pop(0)
-            wait_time = current_time - arrival_time
-            service_time = exp_rv(1/service_rate)
-            wait_times.append(wait_time)
-            response_times.append(wait_time + service_time)
-            heapq.heappush(event_list, (current_time + service_time, DEPARTURE))
-        else:
-            server_busy = False
-
-# Final update
-time_total = current_time
-avg_wait, ci_wait = confidence_interval(wait_times)
-avg_response, ci_response = confidence_interval(response_times)
-avg_queue_length = area_queue / time_total
-avg_utilization = area_busy / time_total
-
-# Print results
-print(f"\nSimulation Results for λ={arrival_rate}, μ={service_rate}")
-print(f"Number of customers served: {num_customers_served}")
-print(f"Total simulation time: {time_total:.2f}")
-print(f"Average wait time: {avg_wait:.4f} (95% CI: {ci_wait[0]:.4f}, {ci_wait[1]:.4f})")
-print(f"Average queue length: {avg_queue_length:.4f}")  # Deterministic, no CI
-print(f"Server utilization: {avg_utilization:.4f}")     # Deterministic, no CI
-print(f"Average response time: {avg_response:.4f} (95% CI: {ci_response[0]:.4f}, {ci_response[1]:.4f})")
+    if n > 1:
+        stddev = statistics.stdev(data)
+        z = 1.96  # for 95% confidence
+        margin = z * (stddev / math.sqrt(n))
+    else:
+        margin = 0.0
+    return mean, margin
+
+def _timed(function, timings, phase):
+    """Wrap function so that its running time is added to timings[phase]."""
+    perf_counter = time.perf_counter
+    def wrapper(*args):
+        start = perf_counter()
+        result = function(*args)
+        timings[phase] += perf_counter() - start
+        return result
+    return wrapper
+
+def run_simulation(arrival_rate, service_rate=1.0, num_customers=1000000, profile=False, capacity=None, gradients=False):
+    """
+    Run a single M/M/1 queue simulation with exponential arrivals and service times.
+    profile: if True, the wall time is split into phases (variate generation, event list,
+    queue operations, statistics bookkeeping) and returned under the "profile" key.
+    capacity: maximum number of customers in the system (K of G/G/1/K), None for an
+    infinite queue. Arrivals finding the system full are blocked and lost; num_customers
+    then counts the arriving customers, served or blocked.
+    gradients: if True, the derivatives of the average wait and response times with
+    respect to λ and μ are estimated from the same run by infinitesimal perturbation
+    analysis (IPA), with batch-means margins (infinite queue only).
+    """
+    start_time = time.perf_counter()
+
+    # Check system stability (a finite queue is always stable)
+    utilization = arrival_rate / service_rate
+    if capacity is None and utilization >= 1:
+        raise ValueError(f"Unstable system: λ={arrival_rate}, μ={service_rate}, ρ={utilization}")
+    if capacity is not None and capacity < 1:
+        raise ValueError(f"The capacity must be at least 1 (got {capacity})")
+    if gradients and capacity is not None:
+        raise ValueError("IPA gradients need an infinite queue (blocking makes them biased)")
+    beta = 1 / arrival_rate
+    service_mean = 1 / service_rate
+
+    # Hot-path operations, wrapped with timers only when profiling
+    timings = {"variates": 0.0, "event_list": 0.0, "queue": 0.0}
+    sample = exp_rv
+    push = heapq.heappush
+    pop = heapq.heappop
+    queue = [] if capacity is None else RingBuffer(capacity - 1)
+    waiting_room = math.inf if capacity is None else capacity - 1
+    enqueue = queue.append
+    dequeue = queue.pop
+    if profile:
+        sample = _timed(sample, timings, "variates")
+        push = _timed(push, timings, "event_list")
+        pop = _timed(pop, timings, "event_list")
+        enqueue = _timed(enqueue, timings, "queue")
+        dequeue = _timed(dequeue, timings, "queue")
+
+    # Events
+    ARRIVAL = 1
+    DEPARTURE = 2
+
+    # State variables
+    current_time = 0.0
+    server_busy = False
+    event_list = []
+    last_event_time = 0.0
+
+    # Statistics
+    num_customers_served = 0
+    num_blocked = 0
+    blocked_arrivals = None if capacity is None else BatchCounter(num_customers)
+    area_queue = 0.0
+    area_busy = 0.0
+
+    # Individual observations (running statistics)
+    wait_times = RunningStatistics()
+    response_times = RunningStatistics()
+
+    # IPA: interarrival times scale with 1/λ and service times with 1/μ, so an arrival
+    # time T has dT/dλ = -T/λ and a service time S has dS/dμ = -S/μ. The derivatives
+    # of the departure time of the customer in service are carried along.
+    departure_dlambda = 0.0
+    departure_dmu = 0.0
+    wait_dlambda = BatchMeans(num_customers)
+    wait_dmu = BatchMeans(num_customers)
+    response_dmu = BatchMeans(num_customers)
+
+    # Schedule the first arrival
+    push(event_list, (sample(beta), ARRIVAL))
+
+    # Main simulation loop
+    while num_customers_served + num_blocked < num_customers:
+        event_time, event_type = pop(event_list)
+        time_since_last = event_time - last_event_time
+        area_queue += len(queue) * time_since_last
+        area_busy += (1 if server_busy else 0) * time_since_last
+        last_event_time = event_time
+        current_time = event_time
+
+        if event_type == ARRIVAL:
+            if not server_busy:
+                server_busy = True
+                service_time = sample(service_mean)
+                response_times.append(service_time)  # No wait time
+                wait_times.append(0.0)
+                push(event_list, (current_time + service_time, DEPARTURE))
+                if gradients:
+                    departure_dlambda = -current_time / arrival_rate
+                    departure_dmu = -service_time / service_rate
+                    wait_dlambda.append(0.0)
+                    wait_dmu.append(0.0)
+                    response_dmu.append(departure_dmu)
+            elif len(queue) < waiting_room:
+                enqueue(current_time)
+            else:
+                # Full system: the customer is blocked and lost
+                blocked_arrivals.append(num_customers_served + num_blocked + len(queue) + 1)
+                num_blocked += 1
+
+            if num_customers_served + num_blocked + len(queue) + (1 if server_busy else 0) < num_customers:
+                next_arrival = current_time + sample(beta)
+                push(event_list, (next_arrival, ARRIVAL))
+
+        elif event_type == DEPARTURE:
+            num_customers_served += 1
+            if queue:
+                arrival_time = dequeue(0)
+                wait_time = current_time - arrival_time
+                service_time = sample(service_mean)
+                wait_times.append(wait_time)
+                response_times.append(wait_time + service_time)
+                push(event_list, (current_time + service_time, DEPARTURE))
+                if gradients:
+                    # The service starts at the previous departure
+                    wait_dlambda.append(departure_dlambda + arrival_time / arrival_rate)
+                    wait_dmu.append(departure_dmu)
+                    departure_dmu -= service_time / service_rate
+                    response_dmu.append(departure_dmu)
+            else:
+                server_busy = False
+
+    # Final update
+    time_total = current_time
+    avg_wait, wait_margin = wait_times.interval()
+    avg_response, response_margin = response_times.interval()
+    avg_queue_length = area_queue / time_total
+    avg_utilization = area_busy / time_total
+
+    results = {
+        "num_customers_served": num_customers_served,
+        "time_total": time_total,
+        "avg_wait": avg_wait,
+        "wait_margin": wait_margin,
+        "avg_response": avg_response,
+        "response_margin": response_margin,
+        "avg_queue_length": avg_queue_length,
+        "avg_utilization": avg_utilization
+    }
+    if capacity is not None:
+        blocking, blocking_margin = blocking_probability(blocked_arrivals, num_customers_served + num_blocked)
+        results.update({
+            "capacity": capacity,
+            "num_blocked": num_blocked,
+            "blocking_probability": blocking,
+            "blocking_margin": blocking_margin
+        })
+    if gradients:
+        dwait_dlambda, dwait_dlambda_margin = wait_dlambda.interval()
+        dwait_dmu, dwait_dmu_margin = wait_dmu.interval()
+        dresponse_dmu, dresponse_dmu_margin = response_dmu.interval()
+        results.update({
+            "dwait_dlambda": dwait_dlambda,
+            "dwait_dlambda_margin": dwait_dlambda_margin,
+            "dwait_dmu": dwait_dmu,
+            "dwait_dmu_margin": dwait_dmu_margin,
+            "dresponse_dlambda": dwait_dlambda,  # service times do not depend on λ
+            "dresponse_dlambda_margin": dwait_dlambda_margin,
+            "dresponse_dmu": dresponse_dmu,
+            "dresponse_dmu_margin": dresponse_dmu_margin
+        })
+    if profile:
+        # Statistics bookkeeping is everything that is not timed explicitly
+        total = time.perf_counter() - start_time
+        timings["statistics"] = total - sum(timings.values())
+        timings["total"] = total
+        results["profile"] = timings
+    return results
+
+def main(argv=None):
+    """Command-line entry point: simulate a grid of arrival rates, optionally saving the averages to CSV."""
+    parser = argparse.ArgumentParser(description="M/M/1 queue simulation (exponential arrivals and service).")
+    parser.add_argument("--lambdas", nargs="+", type=float, default=[0.2], help="arrival rates λ to simulate")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--customers", type=int, default=1000000, help="number of customers per run")
+    parser.add_argument("--runs", type=int, default=1, help="independent runs per λ")
+    parser.add_argument("--capacity", type=int, default=None, help="system capacity K (arrivals beyond are blocked)")
+    parser.add_argument("--gradients", action="store_true", help="estimate dW/dλ and dW/dμ by IPA")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--output", default=None, help="CSV file for the results (not saved if omitted)")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    service_rate = args.mu
+
+    rows = []
+    for arrival_rate in args.lambdas:
+        runs = []
+        for _ in range(args.runs):
+            results = run_simulation(arrival_rate, service_rate, args.customers, capacity=args.capacity,
+                                     gradients=args.gradients)
+            runs.append(results)
+            avg_wait, wait_margin = results["avg_wait"], results["wait_margin"]
+            avg_response, response_margin = results["avg_response"], results["response_margin"]
+
+            # Print results
+            print(f"\nSimulation Results for λ={arrival_rate}, μ={service_rate}")
+            print(f"Number of customers served: {results['num_customers_served']}")
+            print(f"Total simulation time: {results['time_total']:.2f}")
+            print(f"Average wait time: {avg_wait:.4f} (95% CI: {avg_wait - wait_margin:.4f}, {avg_wait + wait_margin:.4f})")
+            print(f"Average queue length: {results['avg_queue_length']:.4f}")  # Deterministic, no CI
+            print(f"Server utilization: {results['avg_utilization']:.4f}")     # Deterministic, no CI
+            print(f"Average response time: {avg_response:.4f} (95% CI: {avg_response - response_margin:.4f}, {avg_response + response_margin:.4f})")
+            if args.capacity is not None:
+                blocking, blocking_margin = results["blocking_probability"], results["blocking_margin"]
+                print(f"Blocking probability: {blocking:.4f} (95% CI: {blocking - blocking_margin:.4f}, {blocking + blocking_margin:.4f})")
+            if args.gradients:
+                for parameter, symbol in (("dlambda", "λ"), ("dmu", "μ")):
+                    value, margin = results[f"dwait_{parameter}"], results[f"dwait_{parameter}_margin"]
+                    print(f"dW/d{symbol}: {value:.4f} (95% CI: {value - margin:.4f}, {value + margin:.4f})")
+                print(f"Wait change for μ +5% (first order): {0.05 * service_rate * results['dwait_dmu']:+.4f}")
+
+        rows.append({
+            "lambda": arrival_rate,
+            "avg_wait_time": statistics.mean([r['avg_wait'] for r in runs]),
+            "avg_queue_length": statistics.mean([r['avg_queue_length'] for r in runs]),
+            "avg_utilization": statistics.mean([r['avg_utilization'] for r in runs]),
+            "avg_response_time": statistics.mean([r['avg_response'] for r in runs])
+        })
+        if args.capacity is not None:
+            rows[-1]["blocking_probability"] = statistics.mean([r['blocking_probability'] for r in runs])
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Simulation results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
 
 
 # pour le rapport 
@@ -104,4 +280,4 @@ print(f"Average response time: {avg_response:.4f} (95% CI: {ci_response[0]:.4f},
 # je dois comaparer les resultats theoriques avec les resultats simulee 
 # faire les graphes des reultats theoriques
 
-# https://chatgpt.com/share/681532db-9d0c-800c-8436-59f456d390cc
\ No newline at end of file
+# https://chatgpt.com/share/681532db-9d0c-800c-8436-59f456d390cc
@@ -0,0 +1,253 @@
+"""
+Benchmark suite for the queue simulators.
+
+Every case (model, engine, λ, number of customers) runs in a fresh worker
+process so that its peak RSS is not polluted by the previous cases. The
+results are written to a JSON file and compared against a stored baseline:
+a drop of throughput or a growth of peak memory beyond the tolerance is
+reported as a regression and the script exits with status 1. A measured
+case without a baseline entry fails the same way (unless --allow-missing),
+so that no size silently escapes the comparison; --update-baseline merges
+the measured cases into the stored baseline.
+
+Usage:
+    python benchmark.py                                  # full grid
+    python benchmark.py --sizes 100000 --models mm1      # quick check
+    python benchmark.py --sizes 100000 --update-baseline # store a new baseline
+    python benchmark.py --models mg1 --lambdas 0.9 --sizes 1000000 \
+        --engines discipline-fifo discipline-lifo discipline-sjf discipline-srpt discipline-ps --allow-missing
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from functools import partial
+
+from models import MODELS, ROOT, load_simulation
+
+DEFAULT_LAMBDAS = [0.1, 0.5, 0.9]
+DEFAULT_SIZES = [10**5, 10**6, 10**7]
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmark_baseline.json")
+# Keys of disciplines.DISCIPLINES, listed here so that only the discipline
+# cases import disciplines (and NumPy) in their worker process
+DISCIPLINE_NAMES = ("fifo", "lifo", "sjf", "srpt", "ps")
+
+def run_event(model, lambda_value, service_rate, num_customers, seed):
+    """Event-driven simulation (run_simulation of the model module)."""
+    random.seed(seed)
+    simulation = load_simulation(model)
+    return simulation.run_simulation(lambda_value, service_rate, num_customers)
+
+def run_lindley_engine(model, lambda_value, service_rate, num_customers, seed):
+    """Vectorised Lindley recursion on one core."""
+    from lindley import run_lindley
+    return run_lindley(model, lambda_value, service_rate, num_customers, seed)
+
+def run_parallel_engine(model, lambda_value, service_rate, num_customers, seed):
+    """Single sample path over all cores (max-plus prefix scan)."""
+    from parallel_lindley import run_parallel
+    return run_parallel(model, lambda_value, service_rate, num_customers, seed)
+
+def run_discipline_engine(discipline, model, lambda_value, service_rate, num_customers, seed):
+    """Event loop with a pluggable scheduling discipline (disciplines.py)."""
+    from disciplines import DISCIPLINES, run_discipline
+    if set(DISCIPLINES) != set(DISCIPLINE_NAMES):
+        raise RuntimeError(f"DISCIPLINE_NAMES {DISCIPLINE_NAMES} is out of date with disciplines.DISCIPLINES "
+                           f"({tuple(DISCIPLINES)})")
+    return run_discipline(model, lambda_value, service_rate, num_customers, seed, discipline)
+
+# Engines that can be benchmarked: name -> function(model, λ, μ, n, seed)
+ENGINES = {
+    "event": run_event,
+    "lindley": run_lindley_engine,
+    "parallel": run_parallel_engine,
+}
+ENGINES.update({f"discipline-{name}": partial(run_discipline_engine, name) for name in DISCIPLINE_NAMES})
+
+def case_key(case):
+    return f"{case['model']}/{case['engine']}/{case['lambda']}/{case['num_customers']}"
+
+def _measure(case, repeat, trace_alloc):
+    """
+    Run one case `repeat` times in the current process and return its
+    measurements (best wall time, to filter out the noise of the machine,
+    and the garbage collections of that same repeat).
+    """
+    engine = ENGINES[case["engine"]]
+    args = (case["model"], case["lambda"], case["service_rate"], case["num_customers"], case["seed"])
+
+    wall_time = float("inf")
+    for _ in range(repeat):
+        gc_before = sum(stats["collections"] for stats in gc.get_stats())
+        start = time.perf_counter()
+        results = engine(*args)
+        elapsed = time.perf_counter() - start
+        collections = sum(stats["collections"] for stats in gc.get_stats()) - gc_before
+        if elapsed < wall_time:
+            wall_time, gc_collections = elapsed, collections
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    measurement = dict(case)
+    measurement.update({
+        "wall_time": wall_time,
+        "customers_per_second": case["num_customers"] / wall_time,
+        "peak_rss_kb": peak_rss_kb,
+        "gc_collections": gc_collections,
+        "avg_wait": results["avg_wait"],
+    })
+
+    # tracemalloc slows the run down a lot, so allocations are counted in a
+    # second run that is not used for the timings.
+    if trace_alloc:
+        del results
+        gc.collect()
+        tracemalloc.start()
+        engine(*args)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        measurement["traced_peak_bytes"] = peak
+        measurement["traced_live_blocks"] = sum(stat.count for stat in snapshot.statistics("filename"))
+    return measurement
+
+def _worker(case, repeat, trace_alloc, connection):
+    try:
+        connection.send(_measure(case, repeat, trace_alloc))
+    except BaseException as error:
+        connection.send({"error": f"{type(error).__name__}: {error}"})
+    finally:
+        connection.close()
+
+def run_case(case, repeat=3, trace_alloc=False):
+    """Run one case in a fresh process (spawned, so the RSS starts clean)."""
+    context = multiprocessing.get_context("spawn")
+    parent_connection, child_connection = context.Pipe(duplex=False)
+    process = context.Process(target=_worker, args=(case, repeat, trace_alloc, child_connection))
+    process.start()
+    child_connection.close()
+    try:
+        measurement = parent_connection.recv()
+    except EOFError:
+        measurement = {"error": f"worker died with exit code {process.exitcode}"}
+    process.join()
+    if "error" in measurement:
+        raise RuntimeError(f"{case_key(case)} failed: {measurement['error']}")
+    return measurement
+
+def compare_to_baseline(measurements, baseline, tolerance):
+    """
+    Return a list of regression messages: throughput lower than
+    (1 - tolerance) x baseline, or peak RSS higher than (1 + tolerance) x baseline,
+    and the list of the measured cases missing from the baseline.
+    """
+    reference = {case_key(m): m for m in baseline["results"]}
+    regressions = []
+    missing = []
+    for measurement in measurements:
+        key = case_key(measurement)
+        if key not in reference:
+            missing.append(key)
+            continue
+        old = reference[key]
+        if measurement["customers_per_second"] < (1 - tolerance) * old["customers_per_second"]:
+            regressions.append(
+                f"{key}: throughput {measurement['customers_per_second']:.0f} customers/s "
+                f"< baseline {old['customers_per_second']:.0f} customers/s"
+            )
+        if measurement["peak_rss_kb"] > (1 + tolerance) * old["peak_rss_kb"]:
+            regressions.append(
+                f"{key}: peak RSS {measurement['peak_rss_kb']} kB > baseline {old['peak_rss_kb']} kB"
+            )
+    return regressions, missing
+
+def merge_baseline(baseline, report):
+    """Baseline with the cases of report added or replaced (the other cases are kept)."""
+    merged = {case_key(m): m for m in baseline["results"]}
+    merged.update({case_key(m): m for m in report["results"]})
+    return dict(report, results=list(merged.values()))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the queue simulators.")
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--engines", nargs="+", default=["event"], choices=list(ENGINES))
+    parser.add_argument("--lambdas", nargs="+", type=float, default=DEFAULT_LAMBDAS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES,
+                        help="numbers of customers per run")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate")
+    parser.add_argument("--seed", type=int, default=12345)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file for the results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON file of the stored baseline")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the best time is kept")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown / memory growth before failing")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="merge the results into the baseline instead of comparing")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="only warn about measured cases that have no baseline entry")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="also count allocations with tracemalloc (separate run)")
+    args = parser.parse_args(argv)
+
+    measurements = []
+    for model in args.models:
+        for engine in args.engines:
+            for lambda_value in args.lambdas:
+                for num_customers in args.sizes:
+                    case = {
+                        "model": model,
+                        "engine": engine,
+                        "lambda": lambda_value,
+                        "service_rate": args.mu,
+                        "num_customers": num_customers,
+                        "seed": args.seed,
+                    }
+                    measurement = run_case(case, args.repeat, args.trace_alloc)
+                    measurements.append(measurement)
+                    print(f"{case_key(case):<32} {measurement['wall_time']:8.2f} s "
+                          f"{measurement['customers_per_second']:12.0f} customers/s "
+                          f"{measurement['peak_rss_kb'] / 1024:8.1f} MB peak RSS")
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": measurements,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results saved to {args.output}")
+
+    baseline = {"results": []}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(merge_baseline(baseline, report), f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions, missing = compare_to_baseline(measurements, baseline, args.tolerance)
+    if missing:
+        print(f"\n{'WARNING' if args.allow_missing else 'ERROR'}: {len(missing)} case(s) missing from "
+              f"{args.baseline} (record them with --update-baseline):")
+        for key in missing:
+            print(f"  {key}")
+    if regressions:
+        print("\nPERFORMANCE REGRESSIONS:")
+        for message in regressions:
+            print(f"  {message}")
+    if regressions or (missing and not args.allow_missing):
+        return 1
+    print("No regression against the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
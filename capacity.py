@@ -0,0 +1,201 @@
+"""
+SLA-driven capacity planning: the largest λ (or the smallest μ) for which a
+percentile of the response (or wait) time meets a target.
+
+The percentile grows with the load ρ = λ/μ in both cases, so the answer is
+found by bisection on ρ, in two stages:
+
+1. bracket: a fast analytical approximation of the percentile. The wait
+   has an atom 1 - P_w at 0 and an exponential tail of mean Wq / P_w,
+   and the response adds an independent service time (exact for M/M/1
+   and G/M/1):
+       M/M/1, M/G/1   Wq by Pollaczek-Khinchine, P_w = ρ
+       G/M/1          Wq = σ / (μ(1 - σ)) from the σ-root, P_w = σ
+       GI/G/1 (gg1)   Wq by Kingman's formula, P_w = ρ
+2. refine: bisection with seeded simulations near the boundary. Every
+   candidate reuses the same unit-rate interarrival and service streams,
+   scaled by 1/λ and 1/μ (common random numbers, as in grid.py). The
+   simulated percentile is then monotone in ρ, so the bisection is
+   consistent.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from importance_sampling import mixture
+from lindley import block_waits
+from models import load_theory
+from samplers import MODEL_DISTRIBUTIONS, sampler
+
+# Interarrival and service distributions (the three models, and H2/H2 for Kingman's formula)
+DISTRIBUTIONS = dict(MODEL_DISTRIBUTIONS, gg1=("hyperexponential", "hyperexponential"))
+
+def _cv_squared(kind, cv_squared):
+    return 1.0 if kind == "exponential" else cv_squared
+
+def kingman_wait(lambda_value, service_rate, arrival_cv_squared, service_cv_squared):
+    """Kingman's heavy-traffic approximation of the mean wait Wq of the GI/G/1 queue."""
+    rho = lambda_value / service_rate
+    return rho / (1 - rho) * (arrival_cv_squared + service_cv_squared) / 2 / service_rate
+
+def wait_approximation(model, lambda_value, service_rate=1.0, cv_squared=9.0):
+    """(Wq, P_w): mean wait and probability of waiting, exact or approximate (see module docstring)."""
+    rho = lambda_value / service_rate
+    arrival_kind, service_kind = DISTRIBUTIONS[model]
+    if arrival_kind == "exponential":
+        service_cv_squared = _cv_squared(service_kind, cv_squared)
+        return load_theory("mg1").mg1_theoretical(lambda_value, service_rate, service_cv_squared)["avg_wait_time"], rho
+    if service_kind == "exponential":
+        wait = load_theory("gm1").gm1_theoretical_hyperexp(lambda_value, service_rate, cv_squared=cv_squared)["avg_wait_time"]
+        return wait, service_rate * wait / (1 + service_rate * wait)
+    return kingman_wait(lambda_value, service_rate, cv_squared, cv_squared), rho
+
+def approximate_percentile(model, lambda_value, service_rate, percentile, metric="response", cv_squared=9.0):
+    """Approximate percentile (0-100) of the wait or response time."""
+    wait, probability_wait = wait_approximation(model, lambda_value, service_rate, cv_squared)
+    theta = probability_wait / wait  # rate of the exponential tail of the wait
+    level = 1 - percentile / 100
+    if metric == "wait":
+        return max(0.0, math.log(probability_wait / level) / theta)
+
+    probs, rates, _ = mixture(DISTRIBUTIONS[model][1], 1 / service_rate, cv_squared)
+    def tail(x):
+        # P(S > x) without wait, P(E + S > x) (E exponential of rate θ) after a wait
+        service_tail = np.exp(-rates * x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            convolution = np.where(np.isclose(rates, theta), (1 + theta * x) * np.exp(-theta * x),
+                                   (rates * np.exp(-theta * x) - theta * service_tail) / (rates - theta))
+        return float(probs @ ((1 - probability_wait) * service_tail + probability_wait * convolution))
+    low, high = 0.0, 1.0
+    while tail(high) > level:
+        high *= 2
+    while high - low > 1e-9 * high:
+        middle = 0.5 * (low + high)
+        if tail(middle) > level:
+            low = middle
+        else:
+            high = middle
+    return 0.5 * (low + high)
+
+def _rates(rho, solve_for, lambda_value, service_rate):
+    """(λ, μ) at load ρ, with μ (solve_for="lambda") or λ (solve_for="service_rate") fixed."""
+    if solve_for == "lambda":
+        return rho * service_rate, service_rate
+    return lambda_value, lambda_value / rho
+
+def _bisect(function, low, high, tol):
+    """Largest ρ in [low, high] with function(ρ) <= 0 (function increasing, <= 0 at low, > 0 at high)."""
+    while high - low > tol:
+        middle = 0.5 * (low + high)
+        if function(middle) <= 0:
+            low = middle
+        else:
+            high = middle
+    return low
+
+def optimize_capacity(model, sla_percentile, sla_value, solve_for="lambda", lambda_value=None, service_rate=1.0,
+                      metric="response", cv_squared=9.0, num_customers=1000000, seed=0, tol=1e-3):
+    """
+    Largest arrival rate (solve_for="lambda", μ = service_rate fixed) or
+    smallest service rate (solve_for="service_rate", λ = lambda_value fixed)
+    such that the sla_percentile-th percentile (0-100) of the response or
+    wait time is at most sla_value.
+    tol: accuracy on ρ of the simulated answer
+    Returns the answer, the analytical estimate and the number of simulations.
+    """
+    if model not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown model: {model} (expected one of {', '.join(DISTRIBUTIONS)})")
+    if solve_for not in ("lambda", "service_rate"):
+        raise ValueError(f"solve_for must be 'lambda' or 'service_rate' (got {solve_for})")
+    if solve_for == "service_rate" and lambda_value is None:
+        raise ValueError("lambda_value is required to solve for the service rate")
+    if not 0 < sla_percentile < 100:
+        raise ValueError(f"The percentile must be in (0, 100) (got {sla_percentile})")
+    if metric not in ("response", "wait"):
+        raise ValueError(f"metric must be 'response' or 'wait' (got {metric})")
+    min_rho, max_rho = 1e-4, 1 - 1e-4
+
+    # 1. Analytical estimate and bracket
+    def approximate_excess(rho):
+        lambda_rate, mu_rate = _rates(rho, solve_for, lambda_value, service_rate)
+        return approximate_percentile(model, lambda_rate, mu_rate, sla_percentile, metric, cv_squared) - sla_value
+    if approximate_excess(min_rho) > 0:
+        approximate_rho = min_rho
+    elif approximate_excess(max_rho) <= 0:
+        approximate_rho = max_rho
+    else:
+        approximate_rho = _bisect(approximate_excess, min_rho, max_rho, 1e-9)
+
+    # 2. Simulated percentile with common random numbers
+    arrival_kind, service_kind = DISTRIBUTIONS[model]
+    rng = np.random.default_rng(seed)
+    unit_interarrivals = sampler(1.0, _cv_squared(arrival_kind, cv_squared))(rng, num_customers)
+    unit_services = sampler(1.0, _cv_squared(service_kind, cv_squared))(rng, num_customers)
+    warmup = num_customers // 10
+    excesses = {}
+    def simulated_excess(rho):
+        if rho in excesses:
+            return excesses[rho]
+        lambda_rate, mu_rate = _rates(rho, solve_for, lambda_value, service_rate)
+        services = unit_services / mu_rate
+        times = block_waits(unit_interarrivals / lambda_rate, services)
+        if metric == "response":
+            times += services
+        excesses[rho] = float(np.percentile(times[warmup:], sla_percentile)) - sla_value
+        return excesses[rho]
+
+    low, high = max(approximate_rho * 0.9, min_rho), min(approximate_rho * 1.1 + 1e-3, max_rho)
+    while low > min_rho and simulated_excess(low) > 0:
+        low = max(low / 2, min_rho)
+    if simulated_excess(low) > 0:
+        raise ValueError(f"The SLA cannot be met: the {sla_percentile}th percentile exceeds {sla_value} "
+                         f"even at ρ={low}")
+    while high < max_rho and simulated_excess(high) <= 0:
+        high = min(1 - (1 - high) / 2, max_rho)
+    rho = high if simulated_excess(high) <= 0 else _bisect(simulated_excess, low, high, tol * high)
+
+    lambda_rate, mu_rate = _rates(rho, solve_for, lambda_value, service_rate)
+    approximate_lambda, approximate_mu = _rates(approximate_rho, solve_for, lambda_value, service_rate)
+    return {
+        "solve_for": solve_for,
+        "lambda": lambda_rate,
+        "service_rate": mu_rate,
+        "utilization": rho,
+        "percentile": sla_percentile,
+        "simulated_value": simulated_excess(rho) + sla_value,
+        "approximate_lambda": approximate_lambda,
+        "approximate_service_rate": approximate_mu,
+        "approximate_utilization": approximate_rho,
+        "simulations": len(excesses),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maximum λ (or minimum μ) meeting a latency percentile target.")
+    parser.add_argument("--model", choices=list(DISTRIBUTIONS), default="mg1")
+    parser.add_argument("--percentile", type=float, default=95.0, help="SLA percentile (0-100)")
+    parser.add_argument("--target", type=float, default=20.0, help="SLA value of the percentile")
+    parser.add_argument("--metric", choices=["response", "wait"], default="response")
+    parser.add_argument("--solve-for", choices=["lambda", "service_rate"], default="lambda")
+    parser.add_argument("--lambda", dest="lambda_value", type=float, default=None,
+                        help="arrival rate λ (fixed when solving for μ)")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ (fixed when solving for λ)")
+    parser.add_argument("--cv2", type=float, default=9.0, help="squared coefficient of variation of the hyperexponential times")
+    parser.add_argument("--customers", type=int, default=1000000, help="customers per simulation")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = optimize_capacity(args.model, args.percentile, args.target, args.solve_for, args.lambda_value,
+                                args.mu, args.metric, args.cv2, args.customers, args.seed)
+    wall_time = time.perf_counter() - start
+    print(f"{args.model}: P{args.percentile:g} of the {args.metric} time <= {args.target}")
+    print(f"Analytical estimate: λ={results['approximate_lambda']:.4f}, μ={results['approximate_service_rate']:.4f} "
+          f"(ρ={results['approximate_utilization']:.4f})")
+    print(f"Simulated answer:    λ={results['lambda']:.4f}, μ={results['service_rate']:.4f} "
+          f"(ρ={results['utilization']:.4f}, P{args.percentile:g}={results['simulated_value']:.4f}) "
+          f"after {results['simulations']} simulations in {wall_time:.2f} s")
+
+if __name__ == "__main__":
+    main()
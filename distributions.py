@@ -0,0 +1,313 @@
+"""
+Registry of interarrival and service time distributions.
+
+The simulators only know exp_rv and hyperx. Every distribution here is
+built from its mean and a shape parameter, and provides:
+
+* sample(rng, size): a block of variates drawn with NumPy (the sampler
+  interface of samplers.py, e.g. run_lindley(..., sample_services=d.sample));
+* mean, second_moment, cv_squared: analytic, so that Pollaczek-Khinchine
+  applies directly (mg1_metrics);
+* laplace_transform(s) = E[exp(-s X)]: closed form where it exists,
+  numerical integration of the density otherwise, so that the σ equation
+  of gm1_theoretical applies (gm1_metrics).
+
+Heavy-tailed distributions (lognormal, Pareto, Weibull with shape < 1)
+emit a RuntimeWarning: sample means of waits converge slowly (or not at
+all when the needed moments are infinite), so the confidence intervals
+stay wide and unstable unless many customers are simulated.
+"""
+import argparse
+import math
+import sys
+import warnings
+
+import numpy as np
+
+from models import load_theory
+from samplers import hyperexponential, hyperexponential_probability
+
+class Distribution:
+    """Base class: subclasses define mean, second_moment, sample and laplace_transform or pdf."""
+    name = "distribution"
+    heavy_tailed = False
+
+    @property
+    def variance(self):
+        return self.second_moment - self.mean**2
+
+    @property
+    def cv_squared(self):
+        return self.variance / self.mean**2
+
+    def pdf(self, x):
+        raise NotImplementedError
+
+    def laplace_transform(self, s):
+        """E[exp(-s X)] by numerical integration of the density (vectorised over s)."""
+        from scipy.integrate import quad  # imported here: scipy is slow to import
+        s = np.asarray(s, dtype=float)
+        values = [quad(lambda x, t=t: math.exp(-t * x) * self.pdf(x), 0.0, math.inf, limit=200)[0]
+                  for t in s.ravel()]
+        return np.reshape(values, s.shape)
+
+    def _warn_heavy_tail(self, detail):
+        # Point the warning at the first caller outside this module (a constructor or make_distribution call)
+        frame, stacklevel = sys._getframe(), 1
+        while frame is not None and frame.f_code.co_filename == __file__:
+            frame, stacklevel = frame.f_back, stacklevel + 1
+        warnings.warn(f"{self}: heavy-tailed ({detail}); the confidence intervals of simulated waits "
+                      f"converge slowly, simulate many customers with a fast engine", RuntimeWarning,
+                      stacklevel=stacklevel)
+
+    def __repr__(self):
+        return f"{self.name}(mean={self.mean:g}, cv²={self.cv_squared:g})"
+
+class Exponential(Distribution):
+    name = "exponential"
+
+    def __init__(self, mean):
+        self.mean = mean
+        self.second_moment = 2 * mean**2
+
+    def sample(self, rng, size):
+        return self.mean * rng.standard_exponential(size)
+
+    def pdf(self, x):
+        return math.exp(-x / self.mean) / self.mean
+
+    def laplace_transform(self, s):
+        return 1 / (1 + self.mean * np.asarray(s, dtype=float))
+
+class Erlang(Distribution):
+    """Sum of `order` exponential phases (cv² = 1/order)."""
+    name = "erlang"
+
+    def __init__(self, mean, order=2):
+        if order < 1 or int(order) != order:
+            raise ValueError(f"The order must be a positive integer (got {order})")
+        self.mean = mean
+        self.order = int(order)
+        self.second_moment = mean**2 * (1 + 1 / self.order)
+
+    def sample(self, rng, size):
+        return rng.gamma(self.order, self.mean / self.order, size)
+
+    def pdf(self, x):
+        rate = self.order / self.mean
+        return rate**self.order * x**(self.order - 1) * math.exp(-rate * x) / math.factorial(self.order - 1)
+
+    def laplace_transform(self, s):
+        return (1 + self.mean / self.order * np.asarray(s, dtype=float)) ** -self.order
+
+class Deterministic(Distribution):
+    name = "deterministic"
+
+    def __init__(self, mean):
+        self.mean = mean
+        self.second_moment = mean**2
+
+    def sample(self, rng, size):
+        return np.full(size, float(self.mean))
+
+    def pdf(self, x):
+        raise ValueError("deterministic: an atom has no density (use laplace_transform, which is exact)")
+
+    def laplace_transform(self, s):
+        return np.exp(-self.mean * np.asarray(s, dtype=float))
+
+class Hyperexponential(Distribution):
+    """Morse's balanced-means H2 (the law of hyperx)."""
+    name = "hyperexponential"
+
+    def __init__(self, mean, cv_squared=9.0):
+        self.mean = mean
+        self.p = hyperexponential_probability(cv_squared)
+        self.second_moment = mean**2 * (1 + cv_squared)
+        self._cv_squared = cv_squared
+
+    def sample(self, rng, size):
+        return hyperexponential(rng, size, self.mean, self._cv_squared)
+
+    def pdf(self, x):
+        rates = (2 * self.p / self.mean, 2 * (1 - self.p) / self.mean)
+        return self.p * rates[0] * math.exp(-rates[0] * x) + (1 - self.p) * rates[1] * math.exp(-rates[1] * x)
+
+    def laplace_transform(self, s):
+        s = np.asarray(s, dtype=float)
+        rate_p, rate_q = 2 * self.p / self.mean, 2 * (1 - self.p) / self.mean
+        return self.p * rate_p / (rate_p + s) + (1 - self.p) * rate_q / (rate_q + s)
+
+class Lognormal(Distribution):
+    name = "lognormal"
+    heavy_tailed = True
+
+    def __init__(self, mean, cv_squared=1.0):
+        self.mean = mean
+        self.sigma = math.sqrt(math.log1p(cv_squared))
+        self.mu = math.log(mean) - self.sigma**2 / 2
+        self.second_moment = mean**2 * (1 + cv_squared)
+        self._warn_heavy_tail("subexponential tail, all moments finite")
+
+    def sample(self, rng, size):
+        return rng.lognormal(self.mu, self.sigma, size)
+
+    def pdf(self, x):
+        if x <= 0:
+            return 0.0
+        return math.exp(-(math.log(x) - self.mu)**2 / (2 * self.sigma**2)) / (x * self.sigma * math.sqrt(2 * math.pi))
+
+class Pareto(Distribution):
+    """Pareto with tail index alpha > 1: P(X > x) = (x_m / x)^alpha for x >= x_m."""
+    name = "pareto"
+    heavy_tailed = True
+
+    def __init__(self, mean, alpha=2.5):
+        if alpha <= 1:
+            raise ValueError(f"The Pareto mean is infinite for alpha <= 1 (got {alpha})")
+        self.mean = mean
+        self.alpha = alpha
+        self.minimum = mean * (alpha - 1) / alpha
+        self.second_moment = alpha * self.minimum**2 / (alpha - 2) if alpha > 2 else math.inf
+        finite_moments = math.ceil(alpha) - 1
+        self._warn_heavy_tail(f"moments of order >= {alpha:g} are infinite, "
+                              f"only {finite_moments} finite; the mean M/G/1 wait needs 2, its variance 3")
+
+    def sample(self, rng, size):
+        return self.minimum * (1 + rng.pareto(self.alpha, size))
+
+    def pdf(self, x):
+        return self.alpha * self.minimum**self.alpha / x**(self.alpha + 1) if x >= self.minimum else 0.0
+
+    def laplace_transform(self, s):
+        # Substitution x = x_m / u maps the tail to [0, 1], where the integrand is bounded
+        from scipy.integrate import quad  # imported here: scipy is slow to import
+        s = np.asarray(s, dtype=float)
+        values = [quad(lambda u, t=t: self.alpha * u**(self.alpha - 1) * math.exp(-t * self.minimum / u)
+                       if u > 0 else 0.0, 0.0, 1.0, limit=200)[0] for t in s.ravel()]
+        return np.reshape(values, s.shape)
+
+class Weibull(Distribution):
+    """Weibull with the given shape k: heavy-tailed (subexponential) for k < 1."""
+    name = "weibull"
+
+    def __init__(self, mean, shape=0.5):
+        self.mean = mean
+        self.shape = shape
+        self.scale = mean / math.gamma(1 + 1 / shape)
+        self.second_moment = self.scale**2 * math.gamma(1 + 2 / shape)
+        self.heavy_tailed = shape < 1
+        if self.heavy_tailed:
+            self._warn_heavy_tail(f"shape {shape:g} < 1, all moments finite")
+
+    def sample(self, rng, size):
+        return self.scale * rng.weibull(self.shape, size)
+
+    def pdf(self, x):
+        if x <= 0:
+            return 0.0
+        z = x / self.scale
+        return self.shape / self.scale * z**(self.shape - 1) * math.exp(-z**self.shape)
+
+class Mixture(Distribution):
+    """
+    Mixture of distributions, e.g. a lognormal body with a Pareto tail.
+    pdf is only defined when every component has a density (not with a deterministic component).
+    """
+    name = "mixture"
+
+    def __init__(self, probs, components):
+        probs = np.asarray(probs, dtype=float)
+        if len(probs) != len(components) or np.any(probs < 0) or not math.isclose(probs.sum(), 1.0):
+            raise ValueError("Expected one nonnegative probability per component, summing to 1")
+        self.probs = probs
+        self.components = list(components)
+        self.mean = float(sum(p * c.mean for p, c in zip(probs, components)))
+        self.second_moment = float(sum(p * c.second_moment for p, c in zip(probs, components)))
+        self.heavy_tailed = any(c.heavy_tailed for c in components)
+
+    def sample(self, rng, size):
+        choice = rng.choice(len(self.components), size=size, p=self.probs)
+        values = np.empty(size)
+        for i, component in enumerate(self.components):
+            selected = choice == i
+            values[selected] = component.sample(rng, int(selected.sum()))
+        return values
+
+    def pdf(self, x):
+        return sum(p * c.pdf(x) for p, c in zip(self.probs, self.components))
+
+    def laplace_transform(self, s):
+        return sum(p * c.laplace_transform(s) for p, c in zip(self.probs, self.components))
+
+DISTRIBUTIONS = {
+    "exponential": Exponential,
+    "erlang": Erlang,
+    "deterministic": Deterministic,
+    "hyperexponential": Hyperexponential,
+    "lognormal": Lognormal,
+    "pareto": Pareto,
+    "weibull": Weibull,
+}
+
+def make_distribution(name, mean, **params):
+    """Distribution of the registry with the given mean, e.g. make_distribution("erlang", 1.0, order=3)."""
+    if name not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {name} (expected one of {', '.join(DISTRIBUTIONS)})")
+    return DISTRIBUTIONS[name](mean, **params)
+
+def mg1_metrics(lambda_value, service):
+    """Pollaczek-Khinchine metrics (mg1_theoretical) for any service distribution."""
+    if math.isinf(service.second_moment):
+        raise ValueError(f"{service.name}: E[S²] is infinite, so is the mean M/G/1 wait")
+    return load_theory("mg1").mg1_theoretical(lambda_value, 1 / service.mean, service.cv_squared)
+
+def gm1_metrics(arrival, mu=1.0):
+    """G/M/1 metrics (σ equation of gm1_theoretical) for any interarrival distribution."""
+    return load_theory("gm1").gm1_theoretical(1 / arrival.mean, mu, arrival.laplace_transform)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distribution registry: moments, transforms and M/G/1, G/M/1 checks.")
+    parser.add_argument("--lambda", dest="lambda_value", type=float, default=0.7, help="arrival rate λ")
+    parser.add_argument("--customers", type=int, default=2000000, help="customers of the check simulations")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    args = parser.parse_args(argv)
+
+    from lindley import run_lindley
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        services = {
+            "erlang-3": make_distribution("erlang", 1.0, order=3),
+            "deterministic": make_distribution("deterministic", 1.0),
+            "lognormal cv²=4": make_distribution("lognormal", 1.0, cv_squared=4.0),
+            "weibull k=0.5": make_distribution("weibull", 1.0, shape=0.5),
+            "pareto α=3.5": make_distribution("pareto", 1.0, alpha=3.5),
+            "lognormal + 5% pareto": Mixture([0.95, 0.05], [make_distribution("lognormal", 0.8, cv_squared=1.0),
+                                                            make_distribution("pareto", 4.8, alpha=3.5)]),
+        }
+    lambda_value = args.lambda_value
+    print(f"M/G/1 with λ={lambda_value}: Pollaczek-Khinchine vs simulation ({args.customers} customers)")
+    for label, service in services.items():
+        scaled = lambda_value * service.mean
+        theory = mg1_metrics(scaled, service)
+        results = run_lindley("mm1", scaled, 1 / service.mean, args.customers, args.seed, sample_services=service.sample)
+        print(f"{label:<22} cv²={service.cv_squared:7.3f}  Wq={theory['avg_wait_time']:8.4f}  "
+              f"simulated {results['avg_wait']:8.4f} ± {results['wait_margin']:.4f}")
+
+    print(f"\nG/M/1 with λ={lambda_value}, μ=1: σ equation vs simulation")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        arrivals = {
+            "erlang-2": make_distribution("erlang", 1 / lambda_value, order=2),
+            "deterministic": make_distribution("deterministic", 1 / lambda_value),
+            "lognormal cv²=2": make_distribution("lognormal", 1 / lambda_value, cv_squared=2.0),
+            "weibull k=0.7": make_distribution("weibull", 1 / lambda_value, shape=0.7),
+        }
+    for label, arrival in arrivals.items():
+        theory = gm1_metrics(arrival, 1.0)
+        results = run_lindley("mm1", lambda_value, 1.0, args.customers, args.seed, sample_interarrivals=arrival.sample)
+        print(f"{label:<22} cv²={arrival.cv_squared:7.3f}  Wq={theory['avg_wait_time']:8.4f}  "
+              f"simulated {results['avg_wait']:8.4f} ± {results['wait_margin']:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Data structures shared by the event-driven simulators (run_simulation of
+mm1.py, mg1.py and gm1.py), kept in one place so that the three scripts
+cannot drift apart.
+
+The model folders are not packages (see models.py), so the scripts add
+the repository root to sys.path before importing this module.
+"""
+import math
+import statistics
+from array import array
+
+def confidence_interval(data):
+    """Mean and 95% margin (normal quantile) of independent observations."""
+    mean = statistics.mean(data)
+    if len(data) < 2:
+        return mean, 0.0
+    return mean, 1.96 * statistics.stdev(data) / math.sqrt(len(data))
+
+class RingBuffer:
+    """
+    FIFO of arrival times in a preallocated circular array: the waiting room
+    of a finite queue, with no allocation per customer. Same append / pop(0)
+    / len interface as the list used for the infinite queue.
+    """
+    __slots__ = ("slots", "head", "count")
+
+    def __init__(self, size):
+        self.slots = array("d", [0.0]) * size
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        size = len(self.slots)
+        if self.count == size:
+            raise OverflowError("RingBuffer is full")
+        self.slots[(self.head + self.count) % size] = value
+        self.count += 1
+
+    def pop(self, index=0):
+        """Remove and return the oldest value (only index 0 is supported)."""
+        if index != 0:
+            raise IndexError("RingBuffer only pops its oldest value")
+        if not self.count:
+            raise IndexError("pop from an empty RingBuffer")
+        value = self.slots[self.head]
+        self.head = (self.head + 1) % len(self.slots)
+        self.count -= 1
+        return value
+
+class RunningStatistics:
+    """
+    Mean and 95% margin (as confidence_interval) of a stream of observations,
+    updated by Welford's method without storing them. append() makes it a
+    drop-in replacement for the list of observations.
+    """
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def append(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def interval(self):
+        if self.count < 2:
+            return self.mean, 0.0
+        return self.mean, 1.96 * math.sqrt(self.m2 / (self.count - 1) / self.count)
+
+class BatchCounter:
+    """
+    Number of events (e.g. blocked arrivals) in each batch of consecutive
+    arrivals, as running counters: append(index) counts the event of arrival
+    `index` (0-based) without storing it.
+    """
+    __slots__ = ("batch_size", "counts", "total")
+
+    def __init__(self, num_arrivals, num_batches=32):
+        self.batch_size = max(1, num_arrivals // num_batches)
+        self.counts = [0] * (num_arrivals // self.batch_size)
+        self.total = 0
+
+    def append(self, index):
+        self.total += 1
+        batch = index // self.batch_size
+        if batch < len(self.counts):
+            self.counts[batch] += 1
+
+def blocking_probability(blocked_arrivals, num_arrivals):
+    """
+    Fraction of blocked arrivals and its 95% margin. Blocking comes in bursts,
+    so the margin is computed from batch means over consecutive arrivals.
+    blocked_arrivals: BatchCounter of the blocked arrivals
+    """
+    batch_size = blocked_arrivals.batch_size
+    _, margin = confidence_interval([count / batch_size for count in blocked_arrivals.counts])
+    return blocked_arrivals.total / num_arrivals, margin
+
+class BatchMeans:
+    """
+    Mean and 95% margin of correlated observations (successive customers),
+    from batch means over consecutive observations. Only one running sum per
+    batch is kept; the batch size is set from the expected num_observations.
+    append() makes it a drop-in replacement for the list of observations.
+    """
+    __slots__ = ("batch_size", "sums", "current", "filled", "count")
+
+    def __init__(self, num_observations, num_batches=32):
+        self.batch_size = max(1, num_observations // num_batches)
+        self.sums = []
+        self.current = 0.0
+        self.filled = 0
+        self.count = 0
+
+    def append(self, value):
+        self.current += value
+        self.filled += 1
+        self.count += 1
+        if self.filled == self.batch_size:
+            self.sums.append(self.current)
+            self.current = 0.0
+            self.filled = 0
+
+    def interval(self):
+        mean = (math.fsum(self.sums) + self.current) / self.count
+        if not self.sums:
+            return mean, 0.0
+        _, margin = confidence_interval([total / self.batch_size for total in self.sums])
+        return mean, margin
+
+def batch_confidence_interval(data, num_batches=32):
+    """
+    Mean and 95% margin of correlated observations (successive customers),
+    from batch means over consecutive observations.
+    """
+    batches = BatchMeans(len(data), num_batches)
+    for value in data:
+        batches.append(value)
+    return batches.interval()
@@ -0,0 +1,118 @@
+"""
+Simulate a whole grid of arrival rates in one pass.
+
+exp_rv(1/λ) and hyperx(1/λ, √cv²/λ) are scale families in 1/λ: an interarrival
+time at rate λ is a unit-rate interarrival time divided by λ. The grid engine
+therefore draws a single unit-rate interarrival stream and a single service
+stream, and runs the Lindley recursion of every λ together as a 2-D
+(λ x customer) NumPy computation. The whole table of Comparaison.py costs
+little more than one λ point, and the curves are smooth in λ because all the
+points share the same randomness (common random numbers).
+"""
+import argparse
+import csv
+
+import numpy as np
+
+from lindley import block_sizes, block_waits, default_block_size
+from models import MODELS
+from samplers import model_samplers
+
+DEFAULT_LAMBDAS = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+
+def run_grid(model, lambdas=DEFAULT_LAMBDAS, service_rate=1.0, num_customers=1000000, seed=None, block_size=None,
+             cv_squared=9.0):
+    """
+    Simulate num_customers customers for every arrival rate of `lambdas`.
+    Returns one metric dict per λ (keys of run_simulation plus "lambda").
+    """
+    lambdas = np.asarray(lambdas, dtype=float)
+    if block_size is None:
+        block_size = default_block_size(num_customers)
+    sample_unit_interarrivals, sample_services = model_samplers(model, 1.0, service_rate, cv_squared)
+    rng = np.random.default_rng(seed)
+    scales = (1.0 / lambdas)[:, np.newaxis]
+
+    responses = np.zeros(len(lambdas))
+    unit_arrival_time = 0.0
+    total_service = 0.0
+    block_waits_sums = []
+    block_service_sums = []
+    block_counts = []
+    for size in block_sizes(num_customers, block_size):
+        unit_interarrivals = sample_unit_interarrivals(rng, size)
+        services = sample_services(rng, size)
+        waits = block_waits(scales * unit_interarrivals, services, responses)
+        responses = waits[:, -1] + services[-1]
+        unit_arrival_time += unit_interarrivals.sum()
+        total_service += services.sum()
+        block_waits_sums.append(waits.sum(axis=1))
+        block_service_sums.append(services.sum())
+        block_counts.append(size)
+
+    counts = np.array(block_counts, dtype=float)
+    wait_sums = np.array(block_waits_sums)  # (blocks, λ)
+    service_sums = np.array(block_service_sums)
+    time_total = unit_arrival_time / lambdas + responses
+    total_wait = wait_sums.sum(axis=0)
+
+    # Batch means over the blocks
+    wait_means = wait_sums / counts[:, np.newaxis]
+    response_means = wait_means + (service_sums / counts)[:, np.newaxis]
+    num_batches = len(counts)
+    if num_batches > 1:
+        wait_margins = 1.96 * wait_means.std(axis=0, ddof=1) / np.sqrt(num_batches)
+        response_margins = 1.96 * response_means.std(axis=0, ddof=1) / np.sqrt(num_batches)
+    else:
+        wait_margins = response_margins = np.zeros(len(lambdas))
+
+    results = []
+    for i, lambda_value in enumerate(lambdas):
+        results.append({
+            "lambda": float(lambda_value),
+            "num_customers_served": num_customers,
+            "time_total": float(time_total[i]),
+            "avg_wait": float(total_wait[i] / num_customers),
+            "wait_margin": float(wait_margins[i]),
+            "avg_response": float((total_wait[i] + total_service) / num_customers),
+            "response_margin": float(response_margins[i]),
+            "avg_queue_length": float(total_wait[i] / time_total[i]),
+            "avg_utilization": float(total_service / time_total[i]),
+        })
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a grid of arrival rates with shared random numbers.")
+    parser.add_argument("--model", choices=list(MODELS), default="mg1")
+    parser.add_argument("--lambdas", nargs="+", type=float, default=DEFAULT_LAMBDAS, help="arrival rates λ")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--customers", type=int, default=1000000, help="number of customers per λ")
+    parser.add_argument("--cv2", type=float, default=9.0, help="squared coefficient of variation of the hyperexponential times")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--output", default=None, help="CSV file (default: <model>_grid_results.csv)")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for results in run_grid(args.model, args.lambdas, args.mu, args.customers, args.seed, cv_squared=args.cv2):
+        rows.append({
+            "lambda": results["lambda"],
+            "avg_wait_time": results["avg_wait"],
+            "avg_queue_length": results["avg_queue_length"],
+            "avg_utilization": results["avg_utilization"],
+            "avg_response_time": results["avg_response"],
+            "wait_margin": results["wait_margin"],
+            "response_margin": results["response_margin"],
+        })
+        print(f"λ={results['lambda']:.2f}  Wq={results['avg_wait']:.4f} (± {results['wait_margin']:.4f})  "
+              f"Lq={results['avg_queue_length']:.4f}  ρ={results['avg_utilization']:.4f}  "
+              f"W={results['avg_response']:.4f}")
+
+    output = args.output or f"{args.model}_grid_results.csv"
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Simulation results saved to {output}")
+
+if __name__ == "__main__":
+    main()
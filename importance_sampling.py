@@ -0,0 +1,149 @@
+"""
+Importance sampling of rare waiting-time tails P(W > x) in the G/G/1 queue.
+
+By the Lindley recursion, the stationary wait W has the law of the maximum
+of the random walk S_n = X_1 + ... + X_n with increments X = S - A (service
+minus interarrival time), so P(W > x) = P(the walk ever exceeds x). The
+walk drifts down (ρ < 1), which is why plain simulation almost never sees
+the event for large x.
+
+Exponential tilting: under the tilted laws
+    service       f_S(s) e^{θs} / M_S(θ)
+    interarrival  f_A(a) e^{-θa} / M_A(-θ)
+the walk has increments with density f_X(y) e^{θy - κ(θ)}, κ(θ) = log M_S(θ) + log M_A(-θ).
+For the Cramér root θ* (κ(θ*) = 0, θ* > 0) it drifts up, so it always
+exceeds x, at a time τ with level S_τ, and the likelihood ratio of the path
+is exp(-θ* S_τ). The mean of these weights is an unbiased estimate of
+P(W > x), and its relative error stays bounded when x grows (Siegmund's
+algorithm).
+
+The distributions are mixtures of Erlang(order) components with
+probabilities probs and rates (exponential, Morse's H2 of hyperx, or a fit
+of fitting.py), and a tilted mixture is again such a mixture:
+    probs ∝ probs * (rates / (rates - t))^order,  rates -> rates - t.
+All the replications advance together as NumPy arrays.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from fitting import sample_mixture
+from samplers import MODEL_DISTRIBUTIONS, hyperexponential_probability
+
+def mixture(kind, mean, cv_squared=9.0):
+    """(probs, rates, order) of an exponential or of Morse's H2 (the law of hyperx) with the given mean."""
+    if kind == "exponential":
+        return np.array([1.0]), np.array([1 / mean]), 1
+    p = hyperexponential_probability(cv_squared)
+    return np.array([p, 1 - p]), np.array([2 * p / mean, 2 * (1 - p) / mean]), 1
+
+def moment_generating_function(law, t):
+    """E[exp(t X)] of a mixture (t below its smallest rate)."""
+    probs, rates, order = law
+    return float(np.sum(probs * (rates / (rates - t)) ** order))
+
+def tilt(law, t):
+    """Mixture with density f(x) e^{t x} / M(t)."""
+    probs, rates, order = law
+    weights = probs * (rates / (rates - t)) ** order
+    return weights / weights.sum(), rates - t, order
+
+def cramer_root(arrivals, services, tol=1e-14):
+    """Positive root θ* of κ(θ) = log M_S(θ) + log M_A(-θ) (by bisection, κ is convex)."""
+    def kappa(theta):
+        return (math.log(moment_generating_function(services, theta))
+                + math.log(moment_generating_function(arrivals, -theta)))
+    low, high = 0.0, float(np.min(services[1])) * (1 - 1e-12)
+    while high - low > tol * high:
+        middle = 0.5 * (low + high)
+        if kappa(middle) < 0:
+            low = middle
+        else:
+            high = middle
+    return 0.5 * (low + high), kappa
+
+def _mean(law):
+    probs, rates, order = law
+    return float(np.sum(probs * order / rates))
+
+def tail_probability(arrivals, services, x, replications=100000, seed=None, max_elements=2**22):
+    """
+    Estimate P(W > x) for the G/G/1 queue with the given interarrival and
+    service mixtures by Siegmund's importance sampling.
+    Returns the estimate, its 95% margin and relative error, θ* and the mean
+    number of customers per replication.
+    """
+    if _mean(services) >= _mean(arrivals):
+        raise ValueError(f"Unstable system: E[S]={_mean(services)}, E[A]={_mean(arrivals)}")
+    theta, kappa = cramer_root(arrivals, services)
+    tilted_arrivals = tilt(arrivals, -theta)
+    tilted_services = tilt(services, theta)
+    drift = _mean(tilted_services) - _mean(tilted_arrivals)  # > 0 under the tilted laws
+    rng = np.random.default_rng(seed)
+
+    levels = np.zeros(replications)  # current level, then S_τ
+    steps = np.zeros(replications)
+    active = np.arange(replications)
+    chunk = max(16, int(1.5 * max(x, 0.0) / drift) + 16)
+    while active.size:
+        width = max(1, min(chunk, max_elements // active.size))
+        increments = (sample_mixture(rng, (active.size, width), *tilted_services)
+                      - sample_mixture(rng, (active.size, width), *tilted_arrivals))
+        paths = np.cumsum(increments, axis=1)
+        paths += levels[active, np.newaxis]
+        crossed = paths > x
+        done = crossed.any(axis=1)
+        first = crossed.argmax(axis=1)
+        levels[active[done]] = paths[done, first[done]]
+        steps[active[done]] += first[done] + 1
+        levels[active[~done]] = paths[~done, -1]
+        steps[active[~done]] += width
+        active = active[~done]
+
+    # Likelihood ratio of each path (κ(θ*) = 0, kept for clarity)
+    weights = np.exp(-theta * levels + steps * kappa(theta))
+    estimate = float(weights.mean())
+    margin = 1.96 * float(weights.std(ddof=1)) / math.sqrt(replications) if replications > 1 else 0.0
+    return {
+        "probability": estimate,
+        "margin": margin,
+        "relative_error": margin / estimate if estimate > 0 else math.inf,
+        "theta": theta,
+        "replications": replications,
+        "avg_customers": float(steps.mean()),
+    }
+
+def model_tail_probability(model, lambda_value, x, service_rate=1.0, replications=100000, seed=None, cv_squared=9.0):
+    """P(W > x) for one of the models of the project (laws of exp_rv / hyperx)."""
+    arrival_kind, service_kind = MODEL_DISTRIBUTIONS[model]
+    return tail_probability(mixture(arrival_kind, 1 / lambda_value, cv_squared),
+                            mixture(service_kind, 1 / service_rate, cv_squared),
+                            x, replications, seed)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rare waiting-time tails P(W > x) by importance sampling.")
+    parser.add_argument("--model", choices=list(MODEL_DISTRIBUTIONS), default="mm1")
+    parser.add_argument("--lambda", dest="lambda_value", type=float, default=0.5, help="arrival rate λ")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--x", nargs="+", type=float, default=[10.0, 20.0, 50.0], help="wait thresholds")
+    parser.add_argument("--replications", type=int, default=100000)
+    parser.add_argument("--cv2", type=float, default=9.0, help="squared coefficient of variation of the hyperexponential times")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args(argv)
+
+    for x in args.x:
+        start = time.perf_counter()
+        results = model_tail_probability(args.model, args.lambda_value, x, args.mu, args.replications,
+                                         args.seed, args.cv2)
+        wall_time = time.perf_counter() - start
+        line = (f"P(W > {x:g}) = {results['probability']:.4e} ± {results['margin']:.2e} "
+                f"(relative error {100 * results['relative_error']:.2f}%, θ*={results['theta']:.4f}, {wall_time:.2f} s)")
+        if args.model == "mm1":
+            rho = args.lambda_value / args.mu
+            line += f"  exact {rho * math.exp(-(args.mu - args.lambda_value) * x):.4e}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
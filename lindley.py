@@ -0,0 +1,133 @@
+"""
+Vectorised Lindley recursion for the single-server FIFO queue (G/G/1).
+
+For a FIFO single server, the event loop of run_simulation follows the
+Lindley recursion on the sequence of customers:
+
+    W_k = max(0, R_{k-1} - A_k)    R_k = W_k + S_k
+
+with A_k the interarrival time before customer k, S_k its service time, W_k
+its wait and R_k its response time. The map R_{k-1} -> R_k is
+x -> max(S_k, x + S_k - A_k), a max-plus affine map, so a whole block of
+customers is summarised by a pair (alpha, beta) with
+R_out = max(alpha, R_in + beta), and summaries compose associatively:
+max(a2, max(a1, x + b1) + b2) = max(max(a2, a1 + b2), x + b1 + b2).
+
+Customers are processed in blocks of NumPy arrays: inside a block the waits
+are a cumulative sum minus its running minimum.
+"""
+import math
+
+import numpy as np
+
+from samplers import model_samplers
+
+def default_block_size(num_customers):
+    """Blocks small enough to fit in cache, and at least ~32 of them for the batch means."""
+    return int(min(2**18, max(1024, num_customers // 32)))
+
+def block_sizes(num_customers, block_size):
+    """Sizes of the consecutive blocks covering num_customers customers."""
+    full, rest = divmod(num_customers, block_size)
+    return [block_size] * full + ([rest] if rest else [])
+
+def block_waits(interarrivals, services, response_in=0.0):
+    """
+    Waits of a block of customers given the response time of the customer
+    just before the block (0.0 for an empty system).
+    The customers are along the last axis; leading axes (e.g. one row per
+    arrival rate) are independent queues and broadcast with services and
+    response_in.
+    """
+    increments = np.empty(np.broadcast_shapes(np.shape(interarrivals), np.shape(services)))
+    increments[..., 0] = response_in - interarrivals[..., 0]
+    np.subtract(services[..., :-1], interarrivals[..., 1:], out=increments[..., 1:])
+    cumulative = np.cumsum(increments, axis=-1, out=increments)
+    waits = np.minimum.accumulate(cumulative, axis=-1)
+    np.minimum(waits, 0.0, out=waits)
+    return np.subtract(cumulative, waits, out=waits)  # cumulative sum minus its running minimum
+
+def summary(blocks, response_out_from_empty):
+    """
+    Max-plus summary (alpha, beta) of a sequence of blocks simulated from an
+    empty system: alpha is the response time of its last customer and beta
+    the total service minus the total interarrival time.
+    """
+    beta = sum(block[3] - block[1] for block in blocks)
+    return response_out_from_empty, beta
+
+def apply(summary, response_in):
+    """Response time of the last customer of a summarised sequence, given the customer before it."""
+    alpha, beta = summary
+    return max(alpha, response_in + beta)
+
+def run_blocks(sample_interarrivals, sample_services, rng, num_customers, response_in=0.0, block_size=None):
+    """
+    Simulate num_customers customers block by block.
+    Returns (response_out, blocks) where blocks is a list of per-block sums
+    (customers, interarrival time, wait, service).
+    """
+    if block_size is None:
+        block_size = default_block_size(num_customers)
+    response = response_in
+    blocks = []
+    for size in block_sizes(num_customers, block_size):
+        interarrivals = sample_interarrivals(rng, size)
+        services = sample_services(rng, size)
+        waits = block_waits(interarrivals, services, response)
+        response = waits[-1] + services[-1]
+        blocks.append((size, interarrivals.sum(), waits.sum(), services.sum()))
+    return float(response), blocks
+
+def _margin(batch_means):
+    """95% half-width from batch means."""
+    if len(batch_means) < 2:
+        return 0.0
+    return 1.96 * np.std(batch_means, ddof=1) / math.sqrt(len(batch_means))
+
+def summarize(blocks, response_out):
+    """
+    Turn per-block sums into the metric dict returned by run_simulation.
+    The margins are batch means over the blocks, which accounts for the
+    correlation between successive customers.
+    """
+    sums = np.array(blocks, dtype=float)
+    counts = sums[:, 0]
+    num_customers = counts.sum()
+    # Last departure = arrival of the last customer + its response time
+    time_total = sums[:, 1].sum() + response_out
+    total_wait = sums[:, 2].sum()
+    total_service = sums[:, 3].sum()
+
+    wait_means = sums[:, 2] / counts
+    response_means = (sums[:, 2] + sums[:, 3]) / counts
+    avg_wait = total_wait / num_customers
+    avg_response = (total_wait + total_service) / num_customers
+
+    return {
+        "num_customers_served": int(num_customers),
+        "time_total": time_total,
+        "avg_wait": avg_wait,
+        "wait_margin": _margin(wait_means),
+        "avg_response": avg_response,
+        "response_margin": _margin(response_means),
+        "avg_queue_length": total_wait / time_total,  # area under the queue = sum of the waits
+        "avg_utilization": total_service / time_total,
+    }
+
+def run_lindley(model, lambda_value, service_rate=1.0, num_customers=1000000, seed=None, block_size=None,
+                sample_interarrivals=None, sample_services=None, cv_squared=9.0):
+    """
+    Vectorised single-path simulation of a model (same dynamics and metrics
+    as run_simulation, without the event list).
+    sample_interarrivals, sample_services: optional samplers (rng, size) -> array
+    replacing the distributions of the model (e.g. fitting.fitted_sampler)
+    cv_squared: squared coefficient of variation of the hyperexponential side of the model
+    """
+    model_interarrivals, model_services = model_samplers(model, lambda_value, service_rate, cv_squared)
+    sample_interarrivals = sample_interarrivals or model_interarrivals
+    sample_services = sample_services or model_services
+    rng = np.random.default_rng(seed)
+    response_out, blocks = run_blocks(sample_interarrivals, sample_services, rng, num_customers,
+                                      block_size=block_size)
+    return summarize(blocks, response_out)
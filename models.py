@@ -0,0 +1,51 @@
+"""
+Load the simulation and theory modules of each queue model.
+
+The model folders (M-M-1, M-G-1, G-M-1) are not Python packages because of
+the dashes in their names, so their modules are loaded from the file path.
+"""
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+MODELS = {
+    "mm1": {"directory": "M-M-1", "simulation": "mm1.py", "theory": "TheoricalValues.py"},
+    "mg1": {"directory": "M-G-1", "simulation": "mg1.py", "theory": "TheoricalValues.py"},
+    "gm1": {"directory": "G-M-1", "simulation": "gm1.py", "theory": "TheoricalValues.py"},
+}
+
+def load_module(path, module_name):
+    """
+    Load a module from its file path and register it in sys.modules
+    (so that its functions can be pickled for worker processes).
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
+
+def _model_info(model):
+    if model not in MODELS:
+        raise ValueError(f"Unknown model: {model} (expected one of {', '.join(MODELS)})")
+    return MODELS[model]
+
+def load_simulation(model):
+    """Return the simulation module (run_simulation, samplers) of a model."""
+    info = _model_info(model)
+    path = os.path.join(ROOT, info["directory"], info["simulation"])
+    return load_module(path, model)
+
+def load_theory(model):
+    """Return the theoretical values module of a model."""
+    info = _model_info(model)
+    path = os.path.join(ROOT, info["directory"], info["theory"])
+    return load_module(path, f"{model}_theory")
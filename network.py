@@ -0,0 +1,335 @@
+"""
+Networks of single-server FIFO stations: tandem lines and Jackson networks.
+
+A station is described by its service rate μ and the cv² of its service
+times (exponential for cv² = 1, Morse's hyperexponential otherwise, the
+samplers of samplers.py). Customers arrive from outside at rate γ_j to
+station j, and after a service at station i go to station j with
+probability routing[i][j] or leave with probability 1 - Σ_j routing[i][j].
+
+Two engines:
+
+* tandem line (every customer visits stations 0, 1, ..., m-1 in order):
+  the customers keep their order, so each station is a Lindley recursion
+  (lindley.py) whose interarrival times are the interdeparture times of the
+  station before it, d_k - d_{k-1} = A_k + R_k - R_{k-1}. Whole blocks of
+  customers go through the stations one after the other as NumPy arrays.
+* any other routing: customers overtake each other between stations, so a
+  shared event calendar (heap) is used, with a FIFO queue per station.
+
+run_network picks the vectorised engine whenever the routing is a tandem
+line. Both return per-station metrics (the dict of run_simulation) and
+end-to-end metrics (sojourn time in the network, throughput).
+"""
+import argparse
+import heapq
+import math
+from bisect import bisect_right
+from collections import deque
+
+import numpy as np
+
+from lindley import block_sizes, block_waits, default_block_size, summarize
+from samplers import sampler
+
+def _sampler(rate, cv_squared):
+    """Sampler (rng, size) -> array with mean 1/rate and the given cv²."""
+    return sampler(1 / rate, cv_squared)
+
+def _per_station(value, num_stations):
+    """A scalar applies to every station, a sequence gives one value per station."""
+    values = [value] * num_stations if np.isscalar(value) else list(value)
+    if len(values) != num_stations:
+        raise ValueError(f"Expected {num_stations} values, got {len(values)}")
+    return values
+
+def _margin(sums, counts):
+    """95% half-width of a mean from batch sums."""
+    if len(counts) < 2:
+        return 0.0
+    means = np.asarray(sums) / np.asarray(counts)
+    return float(1.96 * np.std(means, ddof=1) / math.sqrt(len(means)))
+
+def traffic_rates(arrival_rates, routing):
+    """Total arrival rate of every station: solution of λ = γ + λ P (traffic equations)."""
+    arrival_rates = np.asarray(arrival_rates, dtype=float)
+    routing = np.asarray(routing, dtype=float)
+    try:
+        return np.linalg.solve(np.eye(len(arrival_rates)) - routing.T, arrival_rates)
+    except np.linalg.LinAlgError as error:
+        raise ValueError("Customers never leave the network (I - P is singular)") from error
+
+def jackson_theoretical(arrival_rates, service_rates, routing):
+    """
+    Compute theoretical metrics of an open Jackson network (exponential
+    service, product form): every station is an M/M/1 queue with the
+    arrival rate given by the traffic equations.
+    """
+    rates = traffic_rates(arrival_rates, routing).tolist()
+    stations = []
+    for lambda_rate, mu_rate in zip(rates, service_rates):
+        rho = lambda_rate / mu_rate
+        if rho >= 1:
+            raise ValueError(f"Unstable station: λ={lambda_rate}, μ={mu_rate}, ρ={rho}")
+        stations.append({
+            "arrival_rate": lambda_rate,
+            "utilization": rho,
+            "avg_system_length": rho / (1 - rho),
+            "avg_queue_length": rho**2 / (1 - rho),
+            "avg_response_time": 1 / (mu_rate - lambda_rate),
+            "avg_wait_time": rho / (mu_rate - lambda_rate),
+        })
+    throughput = float(np.sum(arrival_rates))
+    return {
+        "throughput": throughput,
+        "avg_sojourn_time": sum(station["avg_system_length"] for station in stations) / throughput,
+        "stations": stations,
+    }
+
+def _check_stability(arrival_rates, service_rates, routing):
+    rates = traffic_rates(arrival_rates, routing)
+    for station, (lambda_rate, mu_rate) in enumerate(zip(rates, service_rates)):
+        if lambda_rate <= 0:
+            raise ValueError(f"Station {station} is never visited")
+        if lambda_rate >= mu_rate:
+            raise ValueError(f"Unstable station {station}: λ={lambda_rate}, μ={mu_rate}, ρ={lambda_rate / mu_rate}")
+
+def is_tandem(arrival_rates, routing):
+    """True when all customers enter at station 0 and visit every station in order."""
+    routing = np.asarray(routing, dtype=float)
+    chain = np.eye(len(arrival_rates), k=1)
+    return arrival_rates[0] > 0 and not any(arrival_rates[1:]) and np.array_equal(routing, chain)
+
+def run_tandem(lambda_value, service_rates, num_customers=1000000, seed=None, arrival_cv_squared=1.0,
+               service_cv_squared=1.0, block_size=None):
+    """
+    Vectorised simulation of num_customers customers through a tandem line.
+    service_cv_squared: one value for all the stations or one per station
+    """
+    num_stations = len(service_rates)
+    if block_size is None:
+        block_size = default_block_size(num_customers)
+    sample_interarrivals = _sampler(lambda_value, arrival_cv_squared)
+    sample_services = [_sampler(rate, cv_squared) for rate, cv_squared
+                       in zip(service_rates, _per_station(service_cv_squared, num_stations))]
+    rng = np.random.default_rng(seed)
+
+    responses = np.zeros(num_stations)  # response time of the last customer at each station
+    station_blocks = [[] for _ in range(num_stations)]
+    sojourn_sums = []
+    counts = []
+    total_interarrival = 0.0
+    for size in block_sizes(num_customers, block_size):
+        interarrivals = sample_interarrivals(rng, size)
+        total_interarrival += interarrivals.sum()
+        sojourns = np.zeros(size)
+        for station in range(num_stations):
+            services = sample_services[station](rng, size)
+            station_responses = block_waits(interarrivals, services, responses[station])
+            station_blocks[station].append((size, interarrivals.sum(), station_responses.sum(), services.sum()))
+            station_responses += services
+            sojourns += station_responses
+            # Interdeparture times = interarrival times of the next station
+            interarrivals = interarrivals + np.diff(station_responses, prepend=responses[station])
+            responses[station] = station_responses[-1]
+        sojourn_sums.append(sojourns.sum())
+        counts.append(size)
+
+    stations = [summarize(blocks, float(responses[station])) for station, blocks in enumerate(station_blocks)]
+    # The last customer to arrive is also the last one to leave
+    time_total = total_interarrival + float(responses.sum())
+    return _network_results(stations, sojourn_sums, counts, time_total, "tandem")
+
+def _network_results(stations, sojourn_sums, counts, time_total, engine):
+    num_customers = int(sum(counts))
+    total_sojourn = float(sum(sojourn_sums))
+    return {
+        "engine": engine,
+        "num_customers_served": num_customers,
+        "time_total": time_total,
+        "throughput": num_customers / time_total,
+        "avg_sojourn": total_sojourn / num_customers,
+        "sojourn_margin": _margin(sojourn_sums, counts),
+        "avg_in_system": total_sojourn / time_total,
+        "stations": stations,
+    }
+
+def _idle_station(time_total):
+    """Metrics of a station that no customer visited during the run."""
+    return {
+        "num_customers_served": 0,
+        "time_total": time_total,
+        "avg_wait": 0.0,
+        "wait_margin": 0.0,
+        "avg_response": 0.0,
+        "response_margin": 0.0,
+        "avg_queue_length": 0.0,
+        "avg_utilization": 0.0,
+    }
+
+def _stream(sample, rng, block_size):
+    """Endless stream of Python floats drawn block by block."""
+    while True:
+        yield from sample(rng, block_size).tolist()
+
+def run_event_network(arrival_rates, service_rates, routing, num_customers=1000000, seed=None,
+                      arrival_cv_squared=1.0, service_cv_squared=1.0, block_size=None):
+    """
+    Event-calendar simulation of a network with any routing, until
+    num_customers customers have left it.
+    """
+    num_stations = len(service_rates)
+    if block_size is None:
+        block_size = default_block_size(num_customers)
+    rng = np.random.default_rng(seed)
+    draw_size = min(block_size, 2**14)
+    interarrivals = [_stream(_sampler(rate, arrival_cv_squared), rng, draw_size) if rate > 0 else None
+                     for rate in arrival_rates]
+    services = [_stream(_sampler(rate, cv_squared), rng, draw_size) for rate, cv_squared
+                in zip(service_rates, _per_station(service_cv_squared, num_stations))]
+    routes = [_stream(lambda rng, size: rng.random(size), rng, draw_size) for _ in range(num_stations)]
+    cumulative_routing = np.cumsum(np.asarray(routing, dtype=float), axis=1).tolist()
+
+    # Events
+    ARRIVAL = 1
+    DEPARTURE = 2
+
+    calendar = []
+    queues = [deque() for _ in range(num_stations)]
+    in_service = [None] * num_stations  # (entry time in the network, arrival time at the station, service time)
+    visits = [0] * num_stations
+    wait_sums = [0.0] * num_stations
+    service_sums = [0.0] * num_stations
+    push = heapq.heappush
+    pop = heapq.heappop
+
+    def enter(station, now, entry):
+        if in_service[station] is None:
+            service_time = next(services[station])
+            in_service[station] = (entry, now, service_time)
+            push(calendar, (now + service_time, DEPARTURE, station))
+        else:
+            queues[station].append((entry, now))
+
+    for station, stream in enumerate(interarrivals):
+        if stream is not None:
+            push(calendar, (next(stream), ARRIVAL, station))
+
+    # Batches of block_size departures from the network, for the batch means
+    station_blocks = [[] for _ in range(num_stations)]
+    snapshots = [(0, 0.0, 0.0)] * num_stations  # (visits, wait, service) at the last batch boundary
+    snapshot_times = [0.0] * num_stations
+    sojourn_sums = []
+    counts = []
+    completed = 0
+    sojourn_sum = 0.0
+    batch_count = 0
+
+    now = 0.0
+    while completed < num_customers:
+        now, event_type, station = pop(calendar)
+        if event_type == ARRIVAL:
+            push(calendar, (now + next(interarrivals[station]), ARRIVAL, station))
+            enter(station, now, now)
+            continue
+
+        entry, arrival, service_time = in_service[station]
+        visits[station] += 1
+        wait_sums[station] += now - arrival - service_time
+        service_sums[station] += service_time
+        if queues[station]:
+            next_entry, next_arrival = queues[station].popleft()
+            next_service = next(services[station])
+            in_service[station] = (next_entry, next_arrival, next_service)
+            push(calendar, (now + next_service, DEPARTURE, station))
+        else:
+            in_service[station] = None
+
+        destination = bisect_right(cumulative_routing[station], next(routes[station]))
+        if destination < num_stations:
+            enter(destination, now, entry)
+            continue
+
+        # The customer leaves the network
+        completed += 1
+        batch_count += 1
+        sojourn_sum += now - entry
+        if batch_count == block_size or completed == num_customers:
+            sojourn_sums.append(sojourn_sum)
+            counts.append(batch_count)
+            sojourn_sum = 0.0
+            batch_count = 0
+            for j in range(num_stations):
+                # A station without visits in this batch carries its time over to the next one
+                if visits[j] > snapshots[j][0] or completed == num_customers:
+                    old_visits, old_wait, old_service = snapshots[j]
+                    station_blocks[j].append((visits[j] - old_visits, now - snapshot_times[j],
+                                              wait_sums[j] - old_wait, service_sums[j] - old_service))
+                    snapshots[j] = (visits[j], wait_sums[j], service_sums[j])
+                    snapshot_times[j] = now
+
+    stations = []
+    for blocks in station_blocks:
+        if len(blocks) == 1 and blocks[0][0] == 0:
+            stations.append(_idle_station(now))
+            continue
+        if blocks[-1][0] == 0:  # no visit since the previous batch: merge the elapsed time into it
+            elapsed = blocks.pop()[1]
+            previous = blocks.pop()
+            blocks.append((previous[0], previous[1] + elapsed, previous[2], previous[3]))
+        stations.append(summarize(blocks, 0.0))
+    return _network_results(stations, sojourn_sums, counts, now, "event")
+
+def run_network(arrival_rates, service_rates, routing, num_customers=1000000, seed=None,
+                arrival_cv_squared=1.0, service_cv_squared=1.0, block_size=None):
+    """
+    Simulate an open network of FIFO stations until num_customers customers
+    have left it, with the vectorised tandem engine when the routing allows
+    it and the event calendar otherwise.
+    arrival_rates: external arrival rate γ_j of every station
+    routing: matrix of the probabilities routing[i][j] to go from station i to station j
+    Returns the end-to-end metrics and the per-station metric dicts ("stations").
+    """
+    arrival_rates = list(arrival_rates)
+    _check_stability(arrival_rates, service_rates, routing)
+    if is_tandem(arrival_rates, routing):
+        return run_tandem(arrival_rates[0], service_rates, num_customers, seed, arrival_cv_squared,
+                          service_cv_squared, block_size)
+    return run_event_network(arrival_rates, service_rates, routing, num_customers, seed,
+                             arrival_cv_squared, service_cv_squared, block_size)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a tandem line or a Jackson network of FIFO stations.")
+    parser.add_argument("--mu", nargs="+", type=float, default=[1.0] * 5, help="service rate of every station")
+    parser.add_argument("--arrivals", nargs="+", type=float, default=[0.8],
+                        help="external arrival rates (missing stations get 0)")
+    parser.add_argument("--routing", nargs="+", default=None,
+                        help="routing matrix, one comma-separated row per station (default: tandem line)")
+    parser.add_argument("--customers", type=int, default=1000000, help="number of customers leaving the network")
+    parser.add_argument("--arrival-cv2", type=float, default=1.0, help="cv² of the external interarrival times")
+    parser.add_argument("--service-cv2", nargs="+", type=float, default=[1.0], help="cv² of the service times (one or per station)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args(argv)
+
+    num_stations = len(args.mu)
+    arrival_rates = args.arrivals + [0.0] * (num_stations - len(args.arrivals))
+    if args.routing is None:
+        routing = np.eye(num_stations, k=1)
+    else:
+        routing = np.array([[float(p) for p in row.split(",")] for row in args.routing])
+    service_cv_squared = args.service_cv2[0] if len(args.service_cv2) == 1 else args.service_cv2
+
+    results = run_network(arrival_rates, args.mu, routing, args.customers, args.seed,
+                          args.arrival_cv2, service_cv_squared)
+    print(f"\nNetwork of {num_stations} stations ({results['engine']} engine), "
+          f"{results['num_customers_served']} customers")
+    for station, metrics in enumerate(results["stations"]):
+        print(f"Station {station}: visits={metrics['num_customers_served']}  "
+              f"Wq={metrics['avg_wait']:.4f} (± {metrics['wait_margin']:.4f})  "
+              f"Lq={metrics['avg_queue_length']:.4f}  ρ={metrics['avg_utilization']:.4f}")
+    print(f"Average sojourn time: {results['avg_sojourn']:.4f} (± {results['sojourn_margin']:.4f})")
+    print(f"Throughput: {results['throughput']:.4f}")
+    print(f"Average number in the network: {results['avg_in_system']:.4f}")
+
+if __name__ == "__main__":
+    main()
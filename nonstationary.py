@@ -0,0 +1,216 @@
+"""
+Queue with a time-varying arrival rate λ(t) (e.g. diurnal traffic).
+
+generate_arrival_times and exp_rv assume a constant rate. Here the arrival
+process is a non-homogeneous Poisson process, generated block by block:
+
+* piecewise-constant λ(t) (optionally repeating with a period, e.g. 24 h):
+  exact inversion of the cumulative intensity Λ(t), t_k = Λ^{-1}(E_1 + ... + E_k)
+  with unit exponentials E_i;
+* any vectorised function λ(t) bounded by rate_max: Lewis-Shedler thinning,
+  candidates at rate rate_max kept with probability λ(t) / rate_max.
+
+The arrivals are streamed in blocks through the Lindley recursion of
+lindley.py, so a long horizon is never held in memory. The metrics are
+bucketed in time: arrival rate, mean wait of the customers arriving in the
+bucket, time-average queue length and utilization. With a period, the
+buckets are folded over the periods (the same hour of every day) and get
+95% margins over the periods.
+"""
+import argparse
+
+import numpy as np
+
+from lindley import block_waits
+from samplers import sampler
+from transient import interval_areas, pointwise_mean, pointwise_ratio
+
+DEFAULT_BLOCK_SIZE = 2**16
+
+def piecewise_rate(breakpoints, rates, period=None):
+    """Vectorised λ(t) equal to rates[i] from breakpoints[i] on (repeating every period if given)."""
+    breakpoints = np.asarray(breakpoints, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    def rate(t):
+        t = np.asarray(t, dtype=float)
+        if period is not None:
+            t = np.mod(t, period)
+        return rates[np.searchsorted(breakpoints, t, side="right") - 1]
+    return rate
+
+def piecewise_arrivals(breakpoints, rates, rng, horizon, period=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Yield blocks of arrival times up to horizon of a Poisson process with
+    piecewise-constant rate, by inversion of the cumulative intensity.
+    breakpoints: start of every segment (the first one is 0); without a
+    period the last rate holds forever
+    """
+    breakpoints = np.asarray(breakpoints, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    if breakpoints[0] != 0 or np.any(np.diff(breakpoints) <= 0) or np.any(rates < 0):
+        raise ValueError("breakpoints must start at 0 and increase, and rates must be nonnegative")
+    ends = np.append(breakpoints[1:], period if period is not None else np.inf)
+    if period is not None and breakpoints[-1] >= period:
+        raise ValueError("The last breakpoint must be before the period")
+    # Cumulative intensity at the start of every segment (and over a whole period)
+    cumulative = np.concatenate(([0.0], np.cumsum(rates[:-1] * np.diff(breakpoints))))
+    per_period = cumulative[-1] + rates[-1] * (ends[-1] - breakpoints[-1]) if period is not None else np.inf
+    if per_period == 0 or (period is None and rates[-1] == 0):
+        raise ValueError("The arrival rate must not vanish forever")
+
+    total = 0.0  # Λ at the last arrival
+    while True:
+        intensities = total + np.cumsum(rng.standard_exponential(block_size))
+        total = intensities[-1]
+        if period is not None:
+            cycles, intensities = np.divmod(intensities, per_period)
+        else:
+            cycles = 0.0
+        segments = np.searchsorted(cumulative, intensities, side="right") - 1
+        times = breakpoints[segments] + (intensities - cumulative[segments]) / rates[segments]
+        if period is not None:
+            times += cycles * period
+        if times[-1] > horizon:
+            yield times[times <= horizon]
+            return
+        yield times
+
+def thinned_arrivals(rate, rate_max, rng, horizon, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Yield blocks of arrival times up to horizon of a Poisson process with
+    rate λ(t) <= rate_max (rate is a vectorised function), by thinning.
+    """
+    clock = 0.0
+    while clock <= horizon:
+        candidates = clock + np.cumsum(rng.standard_exponential(block_size) / rate_max)
+        clock = candidates[-1]
+        candidates = candidates[candidates <= horizon]
+        intensities = rate(candidates)
+        if np.any(intensities > rate_max * (1 + 1e-12)):
+            raise ValueError(f"λ(t) exceeds rate_max={rate_max}")
+        yield candidates[rng.random(len(candidates)) * rate_max < intensities]
+
+def _add_areas(bucket_areas, starts, ends, edges):
+    """
+    Add the areas of the intervals [starts_k, ends_k) (both sorted) in every
+    bucket; only the buckets between the first start and the last end are touched.
+    """
+    first = max(np.searchsorted(edges, starts[0], side="right") - 1, 0)
+    last = max(min(np.searchsorted(edges, ends[-1], side="left"), len(edges) - 1), first + 1)
+    window = edges[first:last + 1]
+    bucket_areas[first:last] += np.diff(interval_areas(starts[np.newaxis], ends[np.newaxis], window)[0])
+
+def _add_binned(bucket_sums, bucket_counts, values, times, edges):
+    """Add values (with sorted times in [0, horizon]) to the sums and counts of their buckets."""
+    buckets = np.minimum(np.searchsorted(edges, times, side="right") - 1, len(edges) - 2)
+    first = buckets[0]
+    size = buckets[-1] - first + 1
+    bucket_sums[first:first + size] += np.bincount(buckets - first, weights=values, minlength=size)
+    bucket_counts[first:first + size] += np.bincount(buckets - first, minlength=size)
+
+def run_nonstationary(rate, horizon, service_rate=1.0, num_buckets=24, period=None, breakpoints=None,
+                      rate_max=None, service_cv_squared=1.0, seed=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Simulate a single-server FIFO queue fed by a Poisson process of rate λ(t) over [0, horizon].
+    rate: sequence of piecewise-constant rates (on `breakpoints`, by default
+    equal segments of the period or the horizon), or a vectorised function
+    of t bounded by rate_max
+    period: fold the buckets over periods (num_buckets per period, horizon a multiple of period)
+    Returns the overall metrics and the bucketed ones under "buckets".
+    """
+    rng = np.random.default_rng(seed)
+    span = period if period is not None else horizon
+    if callable(rate):
+        if rate_max is None:
+            raise ValueError("rate_max is required to thin a rate function")
+        arrival_blocks = thinned_arrivals(rate, rate_max, rng, horizon, block_size)
+    else:
+        if breakpoints is None:
+            breakpoints = np.linspace(0.0, span, len(rate) + 1)[:-1]
+        arrival_blocks = piecewise_arrivals(breakpoints, rate, rng, horizon, period, block_size)
+    cycles = 1
+    if period is not None:
+        cycles = int(round(horizon / period))
+        if cycles < 1 or not np.isclose(cycles * period, horizon):
+            raise ValueError("The horizon must be a multiple of the period")
+    edges = np.linspace(0.0, horizon, num_buckets * cycles + 1)
+    sample_services = sampler(1 / service_rate, service_cv_squared)
+
+    queue_area = np.zeros(len(edges) - 1)
+    busy_area = np.zeros(len(edges) - 1)
+    wait_sums = np.zeros(len(edges) - 1)
+    wait_counts = np.zeros(len(edges) - 1)
+    last_arrival = 0.0
+    response = 0.0
+    for arrivals in arrival_blocks:
+        if len(arrivals) == 0:
+            continue
+        services = sample_services(rng, len(arrivals))
+        waits = block_waits(np.diff(arrivals, prepend=last_arrival), services, response)
+        starts = arrivals + waits
+        _add_areas(queue_area, arrivals, starts, edges)
+        _add_areas(busy_area, starts, starts + services, edges)
+        _add_binned(wait_sums, wait_counts, waits, arrivals, edges)
+        last_arrival = arrivals[-1]
+        response = waits[-1] + services[-1]
+
+    widths = np.diff(edges)
+    queue_lengths = (queue_area / widths).reshape(cycles, num_buckets)
+    utilizations = (busy_area / widths).reshape(cycles, num_buckets)
+    arrival_rates = (wait_counts / widths).reshape(cycles, num_buckets)
+    avg_queue_length, queue_length_margin = pointwise_mean(queue_lengths)
+    avg_utilization, utilization_margin = pointwise_mean(utilizations)
+    arrival_rate, arrival_rate_margin = pointwise_mean(arrival_rates)
+    avg_wait, wait_margin = pointwise_ratio(wait_sums.reshape(cycles, num_buckets),
+                                            wait_counts.reshape(cycles, num_buckets))
+
+    num_arrivals = int(wait_counts.sum())
+    return {
+        "num_customers_served": num_arrivals,
+        "time_total": horizon,
+        "avg_wait": float(wait_sums.sum() / num_arrivals) if num_arrivals else 0.0,
+        "avg_queue_length": float(queue_area.sum() / horizon),
+        "avg_utilization": float(busy_area.sum() / horizon),
+        "buckets": {
+            "edges": edges[:num_buckets + 1],
+            "periods": cycles,
+            "arrival_rate": arrival_rate,
+            "arrival_rate_margin": arrival_rate_margin,
+            "avg_wait": avg_wait,
+            "wait_margin": wait_margin,
+            "avg_queue_length": avg_queue_length,
+            "queue_length_margin": queue_length_margin,
+            "avg_utilization": avg_utilization,
+            "utilization_margin": utilization_margin,
+        },
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Single-server queue with a piecewise-constant, periodic λ(t).")
+    parser.add_argument("--rates", nargs="+", type=float,
+                        default=[0.2] * 7 + [0.6, 0.9, 0.95, 0.9, 0.8, 0.9, 0.95, 0.9, 0.8, 0.7, 0.6] + [0.4] * 6,
+                        help="arrival rates on equal segments of the period")
+    parser.add_argument("--period", type=float, default=24.0, help="period of λ(t)")
+    parser.add_argument("--periods", type=int, default=1000, help="number of simulated periods")
+    parser.add_argument("--buckets", type=int, default=24, help="buckets per period")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--cv2", type=float, default=1.0, help="squared coefficient of variation of the service times")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args(argv)
+
+    results = run_nonstationary(args.rates, args.period * args.periods, args.mu, args.buckets, args.period,
+                                service_cv_squared=args.cv2, seed=args.seed)
+    buckets = results["buckets"]
+    print(f"\n{results['num_customers_served']} customers over {args.periods} periods; "
+          f"overall Wq={results['avg_wait']:.4f}, Lq={results['avg_queue_length']:.4f}, "
+          f"ρ={results['avg_utilization']:.4f}")
+    print(f"{'t':>16}  {'λ':>6}  {'Wq':>17}  {'Lq':>17}  {'ρ':>6}")
+    edges = buckets["edges"]
+    for b in range(args.buckets):
+        print(f"[{edges[b]:6.2f}, {edges[b + 1]:6.2f})  {buckets['arrival_rate'][b]:6.3f}  "
+              f"{buckets['avg_wait'][b]:8.4f} ± {buckets['wait_margin'][b]:6.4f}  "
+              f"{buckets['avg_queue_length'][b]:8.4f} ± {buckets['queue_length_margin'][b]:6.4f}  "
+              f"{buckets['avg_utilization'][b]:6.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Exact PH/PH/1 queue by the matrix-analytic method (quasi-birth-death process).
+
+A phase-type (PH) distribution (alpha, T) is the time to absorption of a
+Markov chain started with the probability vector alpha, with generator T
+among the transient phases and exit rates t = -T 1. Exponential, Erlang,
+Morse's H2 (hyperx) and the mixtures of fitting.py are all PH.
+
+With PH(alpha, T) interarrival and PH(beta, S) service times, (number in
+system, arrival phase, service phase) is a QBD with the blocks
+    up    A0 = t alpha ⊗ I          local  A1 = T ⊗ I + I ⊗ S
+    down  A2 = I ⊗ s beta
+and level 0 holding the arrival phase only. G (first passage one level
+down) is computed by logarithmic reduction, R = A0 (-A1 - A0 G)^{-1}, and
+the stationary distribution is matrix-geometric: π_n = π_1 R^{n-1}.
+
+The FIFO wait is PH too: W has an atom 1 - η 1 at 0 and
+P(W > x) = η exp((S + s η) x) 1, where η is the fixed point of
+η = beta Â(S + s η), Â(Q) = ∫ exp(Q a) dA(a) the matrix transform of the
+interarrival distribution.
+"""
+import argparse
+
+import numpy as np
+
+from samplers import hyperexponential_probability
+
+def exponential_ph(rate):
+    """PH representation of the exponential distribution."""
+    return np.array([1.0]), np.array([[-rate]])
+
+def erlang_ph(order, mean):
+    """PH representation of the Erlang distribution with `order` phases."""
+    rate = order / mean
+    generator = -rate * np.eye(order) + rate * np.eye(order, k=1)
+    alpha = np.zeros(order)
+    alpha[0] = 1.0
+    return alpha, generator
+
+def hyperexponential_ph(mean, cv_squared=9.0):
+    """PH representation of Morse's H2 with the given mean and cv² (the law of hyperx)."""
+    p = hyperexponential_probability(cv_squared)
+    return np.array([p, 1 - p]), np.diag([-2 * p / mean, -2 * (1 - p) / mean])
+
+def mixture_ph(probs, rates, order=1):
+    """PH representation of a mixture of Erlang(order, rate) components (e.g. a fit of fitting.py)."""
+    blocks = [erlang_ph(order, order / rate) for rate in rates]
+    alpha = np.concatenate([p * block_alpha for p, (block_alpha, _) in zip(probs, blocks)])
+    size = order * len(rates)
+    generator = np.zeros((size, size))
+    for i, (_, block) in enumerate(blocks):
+        generator[i * order:(i + 1) * order, i * order:(i + 1) * order] = block
+    return alpha, generator
+
+def ph_mean(ph):
+    alpha, generator = ph
+    return float(alpha @ np.linalg.solve(-generator, np.ones(len(alpha))))
+
+def logarithmic_reduction(A0, A1, A2, tol=1e-12, max_iter=100):
+    """
+    Minimal solution G of A2 + A1 G + A0 G^2 = 0 (continuous-time QBD with
+    up, local and down blocks A0, A1, A2), by logarithmic reduction.
+    """
+    size = len(A1)
+    identity = np.eye(size)
+    up = np.linalg.solve(-A1, A0)
+    down = np.linalg.solve(-A1, A2)
+    G = down.copy()
+    T = up.copy()
+    for _ in range(max_iter):
+        U = up @ down + down @ up
+        up = np.linalg.solve(identity - U, up @ up)
+        down = np.linalg.solve(identity - U, down @ down)
+        increment = T @ down
+        G += increment
+        T = T @ up
+        # G is stochastic for a stable queue; stop also when rounding leaves nothing to add
+        if np.max(np.abs(1 - G.sum(axis=1))) < tol or np.max(np.abs(increment)) < tol * 1e-3:
+            return G
+    raise RuntimeError("Logarithmic reduction did not converge (is the queue stable?)")
+
+def _matrix_transform(ph, Q):
+    """Â(Q) = ∫ exp(Q a) dA(a) for a PH(alpha, T) distribution A and a matrix Q."""
+    alpha, T = ph
+    size = len(Q)
+    exits = -T.sum(axis=1)
+    kronecker_sum = np.kron(T, np.eye(size)) + np.kron(np.eye(len(alpha)), Q)
+    right = np.kron(exits[:, np.newaxis], np.eye(size))
+    return np.kron(alpha[np.newaxis, :], np.eye(size)) @ np.linalg.solve(-kronecker_sum, right)
+
+def phph1_theoretical(arrival, service, tol=1e-14, max_iter=100000):
+    """
+    Compute the exact metrics of the PH/PH/1 FIFO queue.
+    arrival, service: PH representations (alpha, T)
+    Returns the usual metrics plus queue_length_pmf(n) = P(N = n),
+    wait_tail(x) = P(W > x), probability_empty and the matrices R and G.
+    """
+    alpha, T = arrival
+    beta, S = service
+    lambda_rate = 1 / ph_mean(arrival)
+    utilization = lambda_rate * ph_mean(service)
+    if utilization >= 1:
+        raise ValueError(f"Unstable system: ρ={utilization}")
+    arrival_phases, service_phases = len(alpha), len(beta)
+    arrival_exits = -T.sum(axis=1)
+    service_exits = -S.sum(axis=1)
+    identity_a, identity_s = np.eye(arrival_phases), np.eye(service_phases)
+
+    A0 = np.kron(np.outer(arrival_exits, alpha), identity_s)
+    A1 = np.kron(T, identity_s) + np.kron(identity_a, S)
+    A2 = np.kron(identity_a, np.outer(service_exits, beta))
+    G = logarithmic_reduction(A0, A1, A2)
+    R = A0 @ np.linalg.inv(-A1 - A0 @ G)
+
+    # Boundary: π0 T + π1 (I ⊗ s) = 0, π0 (t alpha ⊗ beta) + π1 (A1 + R A2) = 0, normalised
+    size = arrival_phases * service_phases
+    boundary = np.block([
+        [T, np.kron(np.outer(arrival_exits, alpha), beta[np.newaxis, :])],
+        [np.kron(identity_a, service_exits[:, np.newaxis]), A1 + R @ A2],
+    ])
+    geometric_sum = np.linalg.inv(np.eye(size) - R)  # Σ_n R^{n-1}
+    normalisation = np.concatenate([np.ones(arrival_phases), geometric_sum.sum(axis=1)])
+    system = np.vstack([boundary.T, normalisation])
+    right = np.zeros(len(normalisation) + 1)
+    right[-1] = 1.0
+    solution = np.linalg.lstsq(system, right, rcond=None)[0]
+    pi0, pi1 = solution[:arrival_phases], solution[arrival_phases:]
+
+    probability_empty = float(pi0.sum())
+    avg_system_length = float(pi1 @ geometric_sum @ geometric_sum @ np.ones(size))
+    avg_queue_length = avg_system_length - (1 - probability_empty)
+
+    # Waiting time: fixed point η = beta Â(S + s η)
+    eta = np.zeros(service_phases)
+    for _ in range(max_iter):
+        new_eta = beta @ _matrix_transform(arrival, S + np.outer(service_exits, eta))
+        if np.max(np.abs(new_eta - eta)) < tol:
+            eta = new_eta
+            break
+        eta = new_eta
+    wait_generator = S + np.outer(service_exits, eta)
+    avg_wait_time = float(eta @ np.linalg.solve(-wait_generator, np.ones(service_phases)))
+
+    def queue_length_pmf(n):
+        """P(N = n), N the number of customers in the system."""
+        if n == 0:
+            return probability_empty
+        return float(pi1 @ np.linalg.matrix_power(R, n - 1) @ np.ones(size))
+
+    def wait_tail(x):
+        """P(W > x) for x >= 0."""
+        from scipy.linalg import expm  # imported here: scipy is slow to import
+        return float(eta @ expm(wait_generator * x) @ np.ones(service_phases))
+
+    return {
+        "utilization": utilization,
+        "avg_wait_time": avg_wait_time,
+        "avg_response_time": avg_wait_time + ph_mean(service),
+        "avg_queue_length": avg_queue_length,
+        "avg_system_length": avg_system_length,
+        "probability_empty": probability_empty,
+        "probability_wait": float(eta.sum()),
+        "queue_length_pmf": queue_length_pmf,
+        "wait_tail": wait_tail,
+        "R": R,
+        "G": G,
+    }
+
+def _ph(cv_squared, mean):
+    if cv_squared == 1:
+        return exponential_ph(1 / mean)
+    if cv_squared < 1:
+        # Erlang with the closest cv² = 1/k
+        return erlang_ph(max(1, round(1 / cv_squared)), mean)
+    return hyperexponential_ph(mean, cv_squared)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exact PH/PH/1 queue (matrix-analytic QBD solver).")
+    parser.add_argument("--lambda", dest="lambda_value", type=float, default=0.5, help="arrival rate λ")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--arrival-cv2", type=float, default=9.0,
+                        help="cv² of the interarrival times (1: exponential, > 1: H2, < 1: Erlang)")
+    parser.add_argument("--service-cv2", type=float, default=9.0, help="cv² of the service times")
+    parser.add_argument("--x", nargs="+", type=float, default=[1.0, 10.0, 50.0], help="wait thresholds")
+    args = parser.parse_args(argv)
+
+    results = phph1_theoretical(_ph(args.arrival_cv2, 1 / args.lambda_value), _ph(args.service_cv2, 1 / args.mu))
+    print(f"Average wait time : {results['avg_wait_time']:.4f}")
+    print(f"Average queue length : {results['avg_queue_length']:.4f}")
+    print(f"Server utilization : {results['utilization']:.4f}")
+    print(f"Average response time : {results['avg_response_time']:.4f}")
+    print("P(N = n): " + "  ".join(f"{n}: {results['queue_length_pmf'](n):.4f}" for n in range(6)))
+    print(f"P(W > 0) = {results['probability_wait']:.4f}")
+    for x in args.x:
+        print(f"P(W > {x:g}) = {results['wait_tail'](x):.4e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Vectorised (NumPy) versions of the samplers used by the simulators.
+
+exp_rv and hyperx in mm1.py / mg1.py / gm1.py draw one variate per call from
+the random module. The functions here draw a whole block at once from a
+numpy Generator and follow the same distributions, for the engines that work
+on blocks of customers instead of events.
+"""
+import math
+from functools import lru_cache, partial
+
+import numpy as np
+
+def exponential(rng, size, mean):
+    """Block of exponential variates with the given mean (same law as exp_rv)."""
+    return mean * rng.standard_exponential(size)
+
+@lru_cache(maxsize=None)
+def hyperexponential_probability(cv_squared):
+    """Probability p of the short stage of Morse's H2 with the given cv² (computed once per cv²)."""
+    if cv_squared < 1:
+        raise ValueError("hyperx Error: cv_squared must be at least 1")
+    return 0.5 * (1.0 - math.sqrt((cv_squared - 1.0) / (cv_squared + 1.0)))
+
+def hyperexponential(rng, size, mean, cv_squared=9.0):
+    """
+    Block of variates from Morse's two-stage hyperexponential distribution
+    (same law as hyperx(mean, mean * sqrt(cv_squared))).
+    """
+    p = hyperexponential_probability(cv_squared)
+
+    # Select which exponential to use for each variate
+    scale = np.where(rng.random(size) > p, mean / (1.0 - p), mean / p)
+    return 0.5 * scale * rng.standard_exponential(size)
+
+def gamma(rng, size, mean, cv_squared=0.5):
+    """Block of gamma variates with the given mean and cv² (Erlang for cv² = 1/k)."""
+    shape = 1.0 / cv_squared
+    return rng.gamma(shape, mean / shape, size)
+
+def deterministic(rng, size, mean):
+    """Block of constant times (cv² = 0)."""
+    return np.full(size, float(mean))
+
+def sampler(mean, cv_squared=1.0):
+    """
+    Sampler (rng, size) -> array with the given mean: exponential for cv² = 1,
+    hyperexponential above, gamma below and constant for cv² = 0.
+    """
+    if cv_squared == 1:
+        return partial(exponential, mean=mean)
+    if cv_squared == 0:
+        return partial(deterministic, mean=mean)
+    if cv_squared < 1:
+        return partial(gamma, mean=mean, cv_squared=cv_squared)
+    return partial(hyperexponential, mean=mean, cv_squared=cv_squared)
+
+# Interarrival and service distributions of each model
+MODEL_DISTRIBUTIONS = {
+    "mm1": ("exponential", "exponential"),
+    "mg1": ("exponential", "hyperexponential"),
+    "gm1": ("hyperexponential", "exponential"),
+}
+
+def _sampler(kind, mean, cv_squared):
+    if kind == "exponential":
+        return partial(exponential, mean=mean)
+    return partial(hyperexponential, mean=mean, cv_squared=cv_squared)
+
+def model_samplers(model, lambda_value, service_rate=1.0, cv_squared=9.0):
+    """
+    Return (sample_interarrivals, sample_services) for a model, as functions
+    (rng, size) -> array of variates. cv_squared is the squared coefficient of
+    variation of the hyperexponential side (ignored for mm1).
+    """
+    if model not in MODEL_DISTRIBUTIONS:
+        raise ValueError(f"Unknown model: {model} (expected one of {', '.join(MODEL_DISTRIBUTIONS)})")
+    arrival_kind, service_kind = MODEL_DISTRIBUTIONS[model]
+    return _sampler(arrival_kind, 1 / lambda_value, cv_squared), _sampler(service_kind, 1 / service_rate, cv_squared)
@@ -0,0 +1,272 @@
+"""
+Independent replications in worker processes, aggregated in shared memory.
+
+The main() of mg1.py and gm1.py collect one result dict per run. When the
+runs are spread over processes, every dict (and any histogram or trace
+attached to it) is pickled back to the parent. Here the parent allocates
+multiprocessing.shared_memory NumPy arrays with one row (slot) per
+replication:
+
+* wait_histogram: counts of the waits in `bins` equal bins of [0, wait_max),
+  plus an overflow bin;
+* queue_length: time spent with q customers waiting, q = 0 .. max_queue
+  (the last bin collects q >= max_queue);
+* moments: the sums of MOMENTS (customers, waits, squared waits, ...),
+  including the number of zero waits, so that the percentiles that fall
+  in the atom at 0 are 0 instead of being spread over the first bin.
+
+Every worker attaches to the arrays by name, simulates its replication
+with the Lindley recursion block by block and adds into its own slot, so
+no two processes write the same memory and nothing is returned but None.
+The parent then reduces the slots where they are (sums over the first
+axis of the shared arrays): only the names of the blocks and the seeds are
+pickled, whatever the number of replications.
+
+The queue length is exact: FIFO departure times are nondecreasing, so the
+number in system between two arrivals comes from merging the arrival and
+departure times of each block. Its time average is Σ waits / total time,
+the avg_queue_length of run_simulation.
+"""
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from scipy import stats
+
+from lindley import block_sizes, block_waits
+from models import MODELS
+from samplers import MODEL_DISTRIBUTIONS, model_samplers
+
+# Columns of the moments array
+MOMENTS = ("customers", "wait", "wait_squared", "response", "response_squared", "service", "zero_waits", "time")
+CUSTOMERS, WAIT, WAIT_SQUARED, RESPONSE, RESPONSE_SQUARED, SERVICE, ZERO_WAITS, TIME = range(len(MOMENTS))
+
+class SharedArrays:
+    """
+    float64 NumPy arrays, each in its own multiprocessing.shared_memory block.
+    layout: {key: shape}. Without `names` the blocks are created (zeroed),
+    otherwise the blocks of those names are attached. Views of the arrays
+    must be released before close().
+    """
+
+    def __init__(self, layout, names=None):
+        self.layout = dict(layout)
+        self.blocks = {}
+        self.arrays = {}
+        for key, shape in self.layout.items():
+            size = max(int(np.prod(shape)) * np.dtype(np.float64).itemsize, 1)
+            if names is None:
+                block = SharedMemory(create=True, size=size)
+            else:
+                block = SharedMemory(name=names[key])
+            self.blocks[key] = block
+            self.arrays[key] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+            if names is None:
+                self.arrays[key].fill(0.0)
+
+    def spec(self):
+        """What a worker needs to attach: (layout, block names)."""
+        return self.layout, {key: block.name for key, block in self.blocks.items()}
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def close(self):
+        self.arrays.clear()
+        for block in self.blocks.values():
+            block.close()
+
+    def unlink(self):
+        for block in self.blocks.values():
+            block.unlink()
+
+def _add_queue_time(histogram, levels, edges):
+    """Add the time spent at each number in system (levels between consecutive edges) as queue lengths."""
+    queue = np.minimum(np.maximum(levels - 1, 0), len(histogram) - 1)
+    histogram += np.bincount(queue, weights=np.diff(edges), minlength=len(histogram))
+
+def simulate_into(wait_histogram, queue_length, moments, model, lambda_value, service_rate, num_customers, seed,
+                  cv_squared=9.0, wait_max=100.0, block_size=2**16):
+    """
+    Simulate one replication from an empty system and add its statistics to
+    the given slots (1-D views: wait histogram, queue-length times, moments).
+    """
+    sample_interarrivals, sample_services = model_samplers(model, lambda_value, service_rate, cv_squared)
+    rng = np.random.default_rng(seed)
+    bins = len(wait_histogram) - 1
+    response = 0.0
+    clock = 0.0  # arrival time of the last customer so far
+    pending = np.empty(0)  # departure times after `clock`, nondecreasing (FIFO)
+    for size in block_sizes(num_customers, block_size):
+        interarrivals = sample_interarrivals(rng, size)
+        services = sample_services(rng, size)
+        waits = block_waits(interarrivals, services, response)
+        responses = waits + services
+        response = responses[-1]
+        arrivals = clock + np.cumsum(interarrivals)
+
+        index = np.minimum((waits * (bins / wait_max)).astype(np.int64), bins)
+        wait_histogram += np.bincount(index, minlength=bins + 1)
+        moments[:TIME] += (size, waits.sum(), waits @ waits, responses.sum(), responses @ responses,
+                           services.sum(), np.count_nonzero(waits == 0))
+
+        # Number in system on (clock, last arrival]: merge the arrivals and the departures before it
+        departures = np.concatenate([pending, arrivals + responses])
+        done = np.searchsorted(departures, arrivals[-1], side="right")
+        times = np.concatenate([arrivals, departures[:done]])
+        order = np.argsort(times, kind="stable")
+        steps = np.concatenate([np.ones(size, dtype=np.int64), -np.ones(done, dtype=np.int64)])[order]
+        levels = len(pending) + np.concatenate([[0], np.cumsum(steps)])
+        _add_queue_time(queue_length, levels, np.concatenate([[clock], times[order], [arrivals[-1]]]))
+        pending = departures[done:]
+        clock = arrivals[-1]
+
+    # Drain the system after the last arrival
+    levels = len(pending) - np.arange(len(pending) + 1)
+    _add_queue_time(queue_length, levels[:-1], np.concatenate([[clock], pending]))
+    moments[TIME] += pending[-1] if len(pending) else clock
+
+def _replication(spec, slot, model, lambda_value, service_rate, num_customers, seed, cv_squared, wait_max,
+                 block_size):
+    """Worker: attach to the shared arrays and fill slot `slot`."""
+    arrays = SharedArrays(*spec)
+    try:
+        simulate_into(arrays["wait_histogram"][slot], arrays["queue_length"][slot], arrays["moments"][slot],
+                      model, lambda_value, service_rate, num_customers, seed, cv_squared, wait_max, block_size)
+    finally:
+        arrays.close()
+
+def histogram_percentile(counts, wait_max, percentile, zeros=0.0):
+    """
+    Percentile (0-100) of the waits from their histogram (linear inside a bin, inf in the overflow bin).
+    zeros: number of waits equal to 0 (counted in the first bin); a percentile inside this atom is 0.
+    """
+    bins = len(counts) - 1
+    target = percentile / 100 * np.sum(counts)
+    if target <= zeros:
+        return 0.0
+    counts = np.array(counts, dtype=float)
+    counts[0] -= zeros
+    target -= zeros
+    cumulative = np.cumsum(counts)
+    index = int(np.searchsorted(cumulative, target))
+    if index >= bins:
+        return math.inf
+    below = cumulative[index - 1] if index else 0.0
+    fraction = (target - below) / counts[index] if counts[index] else 0.0
+    return (index + fraction) * wait_max / bins
+
+def _mean_margin(values, confidence):
+    """Mean over the replications and its t margin."""
+    if len(values) < 2:
+        return float(values.mean()), math.inf
+    quantile = float(stats.t.ppf(0.5 + confidence / 2, len(values) - 1))
+    return float(values.mean()), quantile * float(values.std(ddof=1)) / math.sqrt(len(values))
+
+def run_shared_replications(model, lambda_value, service_rate=1.0, num_customers=1000000, runs=10, seed=None,
+                            workers=None, cv_squared=9.0, bins=2000, wait_max=None, max_queue=1000,
+                            block_size=2**16, percentiles=(50, 90, 95, 99), confidence=0.95):
+    """
+    Run `runs` independent replications on `workers` processes, aggregated
+    in shared memory. Returns the metrics of run_simulation with t margins
+    over the replications, the wait percentiles of the pooled histogram and
+    the pooled queue-length distribution.
+    wait_max: upper end of the wait histogram (default: 20 (cv²_a + cv²_s) / (μ - λ), with
+    cv² = 1 on the exponential side of the model)
+    """
+    if lambda_value >= service_rate:
+        raise ValueError(f"Unstable system: λ={lambda_value}, μ={service_rate}")
+    if wait_max is None:
+        arrival_cv_squared, service_cv_squared = (1.0 if kind == "exponential" else cv_squared
+                                                  for kind in MODEL_DISTRIBUTIONS[model])
+        wait_max = 20 * (arrival_cv_squared + service_cv_squared) / (service_rate - lambda_value)
+    workers = workers or os.cpu_count()
+    seeds = np.random.SeedSequence(seed).spawn(runs)
+    arrays = SharedArrays({"wait_histogram": (runs, bins + 1), "queue_length": (runs, max_queue + 1),
+                           "moments": (runs, len(MOMENTS))})
+    try:
+        tasks = (repeat(arrays.spec()), range(runs), repeat(model), repeat(lambda_value), repeat(service_rate),
+                 repeat(num_customers), seeds, repeat(cv_squared), repeat(wait_max), repeat(block_size))
+        if workers == 1:
+            list(map(_replication, *tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_replication, *tasks))
+
+        # Reduce the slots in place (only the per-replication ratios and the pooled rows are new arrays)
+        moments = arrays["moments"]
+        avg_wait, wait_margin = _mean_margin(moments[:, WAIT] / moments[:, CUSTOMERS], confidence)
+        avg_response, response_margin = _mean_margin(moments[:, RESPONSE] / moments[:, CUSTOMERS], confidence)
+        avg_queue_length, queue_margin = _mean_margin(moments[:, WAIT] / moments[:, TIME], confidence)
+        avg_utilization, utilization_margin = _mean_margin(moments[:, SERVICE] / moments[:, TIME], confidence)
+        totals = moments.sum(axis=0)
+        wait_counts = arrays["wait_histogram"].sum(axis=0)
+        queue_time = arrays["queue_length"].sum(axis=0)
+        del moments
+    finally:
+        arrays.close()
+        arrays.unlink()
+
+    customers = totals[CUSTOMERS]
+    return {
+        "num_customers_served": int(customers),
+        "time_total": float(totals[TIME]),
+        "replications": runs,
+        "avg_wait": avg_wait,
+        "wait_margin": wait_margin,
+        "avg_response": avg_response,
+        "response_margin": response_margin,
+        "avg_queue_length": avg_queue_length,
+        "queue_margin": queue_margin,
+        "avg_utilization": avg_utilization,
+        "utilization_margin": utilization_margin,
+        "wait_std": math.sqrt(max(totals[WAIT_SQUARED] / customers - (totals[WAIT] / customers) ** 2, 0.0)),
+        "response_std": math.sqrt(max(totals[RESPONSE_SQUARED] / customers
+                                      - (totals[RESPONSE] / customers) ** 2, 0.0)),
+        "wait_percentiles": {p: histogram_percentile(wait_counts, wait_max, p, totals[ZERO_WAITS])
+                             for p in percentiles},
+        "wait_histogram": wait_counts,
+        "wait_bin_edges": np.linspace(0.0, wait_max, bins + 1),
+        "wait_overflow": float(wait_counts[-1] / customers),
+        "queue_length_distribution": queue_time / queue_time.sum(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel replications aggregated in shared memory.")
+    parser.add_argument("--model", choices=list(MODELS), default="mg1")
+    parser.add_argument("--lambda", dest="lambda_value", type=float, default=0.9, help="arrival rate λ")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--customers", type=int, default=1000000, help="customers per replication")
+    parser.add_argument("--runs", type=int, default=10, help="independent replications")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--cv2", type=float, default=9.0, help="squared coefficient of variation of the hyperexponential times")
+    parser.add_argument("--bins", type=int, default=2000, help="bins of the wait histogram")
+    parser.add_argument("--wait-max", type=float, default=None, help="upper end of the wait histogram")
+    parser.add_argument("--max-queue", type=int, default=1000, help="largest queue length tracked separately")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_shared_replications(args.model, args.lambda_value, args.mu, args.customers, args.runs, args.seed,
+                                      args.workers, args.cv2, args.bins, args.wait_max, args.max_queue)
+    wall_time = time.perf_counter() - start
+    distribution = results["queue_length_distribution"]
+    print(f"{args.model}: {args.runs} replications of {args.customers} customers (λ={args.lambda_value}, "
+          f"μ={args.mu}) in {wall_time:.2f} s")
+    print(f"Average wait time: {results['avg_wait']:.4f} (± {results['wait_margin']:.4f}), "
+          f"std {results['wait_std']:.4f}")
+    print(f"Average response time: {results['avg_response']:.4f} (± {results['response_margin']:.4f})")
+    print(f"Average queue length: {results['avg_queue_length']:.4f} (± {results['queue_margin']:.4f}), "
+          f"from the distribution: {distribution @ np.arange(len(distribution)):.4f}")
+    print(f"Server utilization: {results['avg_utilization']:.4f} (± {results['utilization_margin']:.4f})")
+    print("Wait percentiles: " + ", ".join(f"P{p}={value:.4f}" for p, value in results["wait_percentiles"].items())
+          + f" (overflow {results['wait_overflow']:.2e})")
+    print("P(queue length = q): " + ", ".join(f"{q}: {distribution[q]:.4f}" for q in range(min(6, len(distribution)))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Command-line entry point for the three simulators.
+
+    python simulate.py mg1 --lambdas 0.1 0.5 0.9 --customers 100000 --runs 5 --seed 1 --output mg1.csv
+
+Everything after the model name is passed to the main() of the model module
+(python simulate.py <model> --help lists the options).
+"""
+import argparse
+import sys
+
+from models import MODELS, load_simulation
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the M/M/1, M/G/1 or G/M/1 simulation.")
+    parser.add_argument("model", choices=list(MODELS), help="queue model to simulate")
+    parser.add_argument("options", nargs=argparse.REMAINDER, help="options of the model simulation")
+    args = parser.parse_args(argv)
+    load_simulation(args.model).main(args.options)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Distributed execution of a model x λ x cv² x replication sweep.
+
+Every run of the sweep is a task: its parameters and its seed, serialised
+as JSON in a task store. Workers on any number of nodes claim tasks, run
+run_simulation (or run_lindley) and record the metrics in the same store.
+Two backends share one implementation:
+
+* a SQLite file (SQLiteStore), for nodes that share a file system: every
+  claim and every result is a transaction of the database;
+* a multiprocessing.managers server (serve_store / connect_store), which
+  exposes a store over TCP to workers that only see the network.
+
+A claim is a lease: a worker that dies leaves its task "running" until the
+lease expires, and then another worker runs it again (at most max_attempts
+times; exceptions are retried the same way). The seed is part of the task,
+so every attempt computes the same result, and the results table has the
+task id as primary key: a late duplicate is ignored, and every task is
+recorded exactly once.
+
+Usage:
+    python sweep.py --db sweep.db submit --models mm1 mg1 --lambdas 0.5 0.9 --replications 20
+    python sweep.py --db sweep.db worker --processes 4           # on every node
+    python sweep.py --db sweep.db report --output sweep_results.csv
+or, without a shared file system:
+    python sweep.py --db sweep.db serve --port 50000             # on the coordinator
+    python sweep.py --manager coordinator:50000 submit ...
+    python sweep.py --manager coordinator:50000 worker --processes 4
+"""
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+from scipy import stats
+
+from models import MODELS, load_simulation
+
+SWEEP_ENGINES = ("event", "lindley")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY REFERENCES tasks (id),
+    payload TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    recorded_at REAL NOT NULL
+);
+"""
+
+def task_id(task):
+    """Unique key of a task, built from all its parameters."""
+    return (f"{task['model']}/{task['engine']}/λ={task['lambda']!r}/μ={task['service_rate']!r}/"
+            f"cv2={task['cv_squared']!r}/n={task['num_customers']}/seed={task['seed']}")
+
+def make_tasks(models, lambdas, cv_squareds=(9.0,), replications=10, num_customers=1000000, service_rate=1.0,
+               seed=0, engine="event"):
+    """
+    Tasks of the full grid. Replication r of every point uses the seed
+    seed + r (common random numbers across the points, as in grid.py).
+    M/M/1 has no cv² and gets a single value per λ.
+    """
+    if engine not in SWEEP_ENGINES:
+        raise ValueError(f"Unknown engine: {engine} (expected one of {', '.join(SWEEP_ENGINES)})")
+    tasks = []
+    for model in models:
+        if model not in MODELS:
+            raise ValueError(f"Unknown model: {model} (expected one of {', '.join(MODELS)})")
+        for lambda_value in lambdas:
+            for cv_squared in ([1.0] if model == "mm1" else cv_squareds):
+                for replication in range(replications):
+                    task = {
+                        "model": model,
+                        "engine": engine,
+                        "lambda": float(lambda_value),
+                        "service_rate": float(service_rate),
+                        "cv_squared": float(cv_squared),
+                        "num_customers": int(num_customers),
+                        "replication": replication,
+                        "seed": seed + replication,
+                    }
+                    task["id"] = task_id(task)
+                    tasks.append(task)
+    return tasks
+
+def run_task(task):
+    """Run one task and return its scalar metrics (JSON-serialisable)."""
+    if task["engine"] == "lindley":
+        from lindley import run_lindley
+        results = run_lindley(task["model"], task["lambda"], task["service_rate"], task["num_customers"],
+                              task["seed"], cv_squared=task["cv_squared"])
+    else:
+        random.seed(task["seed"])
+        options = {} if task["model"] == "mm1" else {"cv_squared": task["cv_squared"]}
+        results = load_simulation(task["model"]).run_simulation(task["lambda"], task["service_rate"],
+                                                                 task["num_customers"], **options)
+    return {key: float(value) for key, value in results.items()
+            if isinstance(value, (int, float, np.number)) and not isinstance(value, bool)}
+
+class SQLiteStore:
+    """
+    Task store in a SQLite database (a file, or ":memory:" behind a manager).
+    max_attempts: runs of a task (failures and expired leases) before it is marked failed
+    """
+
+    def __init__(self, path, max_attempts=3, timeout=60.0):
+        self.max_attempts = max_attempts
+        # Explicit transactions; BEGIN IMMEDIATE takes the write lock before reading
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()  # the manager server calls the store from one thread per client
+
+    def _transaction(self, function):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                value = function(self.connection)
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+            return value
+
+    def submit(self, tasks):
+        """Add tasks (submitting a task twice is a no-op). Returns the number of new tasks."""
+        rows = [(task["id"], json.dumps(task)) for task in tasks]
+        def insert(connection):
+            before = connection.total_changes
+            connection.executemany("INSERT OR IGNORE INTO tasks (id, payload) VALUES (?, ?)", rows)
+            return connection.total_changes - before
+        return self._transaction(insert)
+
+    def claim(self, worker, lease=3600.0):
+        """Lease the next pending task (or one whose lease expired) to a worker; None if there is none."""
+        def claim_next(connection):
+            now = time.time()
+            connection.execute("UPDATE tasks SET status = 'failed', error = 'lease expired' "
+                               "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                               (now, self.max_attempts))
+            row = connection.execute("SELECT id, payload FROM tasks WHERE status = 'pending' "
+                                     "OR (status = 'running' AND lease_until < ?) ORDER BY rowid LIMIT 1",
+                                     (now,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE tasks SET status = 'running', worker = ?, lease_until = ?, "
+                               "attempts = attempts + 1 WHERE id = ?", (worker, now + lease, row[0]))
+            return json.loads(row[1])
+        return self._transaction(claim_next)
+
+    def complete(self, task_id, worker, result):
+        """Record the result of a task. Returns False if it was already recorded (by an earlier attempt)."""
+        def record(connection):
+            recorded = connection.execute("INSERT OR IGNORE INTO results (id, payload, worker, recorded_at) "
+                                          "VALUES (?, ?, ?, ?)",
+                                          (task_id, json.dumps(result), worker, time.time())).rowcount == 1
+            connection.execute("UPDATE tasks SET status = 'done', error = NULL WHERE id = ?", (task_id,))
+            return recorded
+        return self._transaction(record)
+
+    def fail(self, task_id, worker, error):
+        """Give a failed task back to the queue, or mark it failed after max_attempts runs."""
+        def release(connection):
+            connection.execute("UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                               "error = ?, lease_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                               (self.max_attempts, error, task_id, worker))
+        self._transaction(release)
+
+    def progress(self):
+        """Number of tasks per status (pending, running, done, failed)."""
+        with self.lock:
+            rows = self.connection.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+    def results(self):
+        """Recorded results: one dict per task (its parameters and its metrics)."""
+        with self.lock:
+            rows = self.connection.execute("SELECT tasks.payload, results.payload FROM results "
+                                           "JOIN tasks ON tasks.id = results.id ORDER BY tasks.rowid").fetchall()
+        return [dict(json.loads(task), **json.loads(result)) for task, result in rows]
+
+    def failures(self):
+        """Failed tasks and their last error."""
+        with self.lock:
+            rows = self.connection.execute("SELECT id, error FROM tasks WHERE status = 'failed'").fetchall()
+        return dict(rows)
+
+class SweepManager(BaseManager):
+    """Manager exposing a task store over TCP (register "store" before use)."""
+
+def serve_store(store, address, authkey):
+    """Serve a store to remote workers until interrupted."""
+    SweepManager.register("store", callable=lambda: store)
+    SweepManager(address=address, authkey=authkey).get_server().serve_forever()
+
+def connect_store(address, authkey):
+    """Proxy of a store served by serve_store (same methods as SQLiteStore)."""
+    SweepManager.register("store")
+    manager = SweepManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.store()
+
+def run_worker(store, worker=None, lease=3600.0, poll=1.0, max_tasks=None):
+    """
+    Claim and run tasks until the sweep is finished (no task pending or
+    running) or max_tasks tasks are done. Returns the number of results recorded.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    completed = recorded = 0
+    while max_tasks is None or completed < max_tasks:
+        task = store.claim(worker, lease)
+        if task is None:
+            counts = store.progress()
+            if not counts.get("pending") and not counts.get("running"):
+                break
+            time.sleep(poll)  # the tasks of other workers may come back when their leases expire
+            continue
+        try:
+            result = run_task(task)
+        except Exception as error:
+            store.fail(task["id"], worker, repr(error))
+            continue
+        recorded += store.complete(task["id"], worker, result)
+        completed += 1
+    return recorded
+
+def _open_store(backend):
+    kind, location, authkey = backend
+    return SQLiteStore(location) if kind == "sqlite" else connect_store(location, authkey)
+
+def _worker_process(backend, lease, poll):
+    return run_worker(_open_store(backend), lease=lease, poll=poll)
+
+def summarize_results(rows, confidence=0.95):
+    """
+    Mean of every metric over the replications of each (model, engine, λ, μ,
+    cv², n) point, with its t margin.
+    """
+    points = {}
+    for row in rows:
+        key = tuple(row[name] for name in ("model", "engine", "lambda", "service_rate", "cv_squared",
+                                           "num_customers"))
+        points.setdefault(key, []).append(row)
+    summary = []
+    for key, replications in points.items():
+        point = dict(zip(("model", "engine", "lambda", "service_rate", "cv_squared", "num_customers"), key))
+        point["replications"] = len(replications)
+        quantile = float(stats.t.ppf(0.5 + confidence / 2, len(replications) - 1)) if len(replications) > 1 else math.inf
+        for metric in ("avg_wait", "avg_response", "avg_queue_length", "avg_utilization"):
+            values = np.array([row[metric] for row in replications if metric in row])
+            point[metric] = float(values.mean())
+            point[f"{metric}_margin"] = (quantile * float(values.std(ddof=1)) / math.sqrt(len(values))
+                                         if len(values) > 1 else math.inf)
+        summary.append(point)
+    return summary
+
+def _address(text):
+    host, _, port = text.rpartition(":")
+    return host, int(port)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a simulation sweep on workers sharing a task store.")
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument("--db", help="SQLite task store (on a file system shared by the nodes)")
+    backend.add_argument("--manager", help="HOST:PORT of a store served by 'serve'")
+    parser.add_argument("--authkey", default="sweep", help="authentication key of the manager")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="add the tasks of a grid")
+    submit.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    submit.add_argument("--lambdas", nargs="+", type=float, default=[0.1, 0.5, 0.9], help="arrival rates λ")
+    submit.add_argument("--cv2", nargs="+", type=float, default=[9.0],
+                        help="squared coefficients of variation of the hyperexponential times")
+    submit.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    submit.add_argument("--customers", type=int, default=1000000, help="customers per run")
+    submit.add_argument("--replications", type=int, default=10, help="independent runs per point")
+    submit.add_argument("--engine", choices=SWEEP_ENGINES, default="event")
+    submit.add_argument("--seed", type=int, default=0, help="seed of the first replication")
+
+    worker = commands.add_parser("worker", help="run tasks until the sweep is finished")
+    worker.add_argument("--processes", type=int, default=1, help="worker processes on this node")
+    worker.add_argument("--lease", type=float, default=3600.0, help="seconds before an unfinished task is rerun")
+    worker.add_argument("--poll", type=float, default=1.0, help="seconds between checks when no task is free")
+
+    serve = commands.add_parser("serve", help="serve the store (--db, or in memory) to remote workers")
+    serve.add_argument("--host", default="", help="interface to listen on (default: all)")
+    serve.add_argument("--port", type=int, default=50000)
+
+    report = commands.add_parser("report", help="progress and per-point summary of the results")
+    report.add_argument("--output", default=None, help="CSV file for the summary")
+    args = parser.parse_args(argv)
+
+    authkey = args.authkey.encode()
+    if args.command == "serve":
+        if args.manager:
+            parser.error("serve needs --db (use --db :memory: for a store without a file)")
+        print(f"Serving {args.db} on port {args.port}")
+        serve_store(SQLiteStore(args.db), (args.host, args.port), authkey)
+        return
+    backend = ("sqlite", args.db, None) if args.db else ("manager", _address(args.manager), authkey)
+
+    if args.command == "submit":
+        tasks = make_tasks(args.models, args.lambdas, args.cv2, args.replications, args.customers, args.mu,
+                           args.seed, args.engine)
+        added = _open_store(backend).submit(tasks)
+        print(f"{added} new tasks ({len(tasks) - added} already submitted)")
+    elif args.command == "worker":
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as pool:
+            recorded = sum(pool.starmap(_worker_process, [(backend, args.lease, args.poll)] * args.processes))
+        print(f"{recorded} results recorded in {time.perf_counter() - start:.1f} s")
+    else:
+        store = _open_store(backend)
+        print("Tasks: " + ", ".join(f"{count} {status}" for status, count in sorted(store.progress().items())))
+        for failed, error in store.failures().items():
+            print(f"FAILED {failed}: {error}")
+        summary = summarize_results(store.results())
+        for point in summary:
+            print(f"{point['model']} {point['engine']} λ={point['lambda']:.2f} cv²={point['cv_squared']:g}  "
+                  f"Wq={point['avg_wait']:.4f} (± {point['avg_wait_margin']:.4f})  "
+                  f"W={point['avg_response']:.4f} (± {point['avg_response_margin']:.4f})  "
+                  f"[{point['replications']} runs]")
+        if args.output and summary:
+            with open(args.output, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(summary[0]))
+                writer.writeheader()
+                writer.writerows(summary)
+            print(f"Summary saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
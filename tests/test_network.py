@@ -0,0 +1,15 @@
+"""Regression checks of the network simulator (python -m pytest tests)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network import run_network
+
+def test_station_without_visits():
+    # Station 2 is almost never reached: over 3 customers it gets no visit
+    results = run_network([0.3, 0, 0], [1, 1, 1], [[0, 0.999, 0.001], [0, 0, 0], [0, 0, 0]], 3, seed=1)
+    idle = results["stations"][2]
+    assert results["num_customers_served"] == 3
+    assert idle["num_customers_served"] == 0
+    assert idle["avg_wait"] == idle["avg_response"] == idle["avg_utilization"] == 0.0
@@ -0,0 +1,166 @@
+"""
+Trace-driven simulation: replay recorded arrivals and service times.
+
+Instead of exp_rv / hyperx draws, the interarrival (or arrival timestamp) and
+service columns are read from a memory-mapped .npy file or an Arrow IPC file
+(.arrow / .feather) in blocks, so multi-GB traces are never fully loaded in
+RAM. The blocks go through the vectorised Lindley recursion of lindley.py
+and the result is the metric dict of run_simulation, plus the measured
+trace statistics and how far the simulated wait is from the M/M/1 and
+Pollaczek-Khinchine (M/G/1) predictions for the same λ and service moments.
+
+Accepted .npy layouts: a structured array with named fields, or a 2-D array
+whose column 0 holds the interarrival times (or timestamps) and column 1
+the service times.
+"""
+import argparse
+import os
+
+import numpy as np
+
+from lindley import block_waits, summarize
+from models import load_theory
+
+DEFAULT_BLOCK_SIZE = 2**16
+
+def _column_pairs_npy(path, arrival_column, service_column, block_size):
+    data = np.load(path, mmap_mode="r")
+    if data.dtype.names:
+        arrivals, services = data[arrival_column], data[service_column]
+    elif data.ndim == 2 and data.shape[1] >= 2:
+        arrivals, services = data[:, 0], data[:, 1]
+    else:
+        raise ValueError(f"{path}: expected a structured array or a 2-D array with 2 columns")
+    for start in range(0, len(arrivals), block_size):
+        yield (np.asarray(arrivals[start:start + block_size], dtype=float),
+               np.asarray(services[start:start + block_size], dtype=float))
+
+def _column_pairs_arrow(path, arrival_column, service_column, block_size):
+    try:
+        import pyarrow as pa
+    except ImportError as error:
+        raise ImportError("pyarrow is required to read Arrow traces") from error
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            arrivals = batch.column(arrival_column)
+            services = batch.column(service_column)
+            for start in range(0, batch.num_rows, block_size):
+                yield (arrivals.slice(start, block_size).to_numpy(zero_copy_only=False).astype(float),
+                       services.slice(start, block_size).to_numpy(zero_copy_only=False).astype(float))
+
+def trace_blocks(path, arrival_column="interarrival", service_column="service", timestamps=False,
+                 block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Yield (interarrivals, services) blocks from a trace file.
+    timestamps: the arrival column holds absolute arrival times instead of
+    interarrival times (the first customer then arrives at time 0).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        pairs = _column_pairs_npy(path, arrival_column, service_column, block_size)
+    elif extension in (".arrow", ".feather", ".ipc"):
+        pairs = _column_pairs_arrow(path, arrival_column, service_column, block_size)
+    else:
+        raise ValueError(f"Unsupported trace format: {extension} (expected .npy or .arrow/.feather)")
+
+    previous = None
+    for arrivals, services in pairs:
+        if timestamps:
+            first = arrivals[0] if previous is None else previous
+            previous = arrivals[-1]
+            arrivals = np.diff(arrivals, prepend=first)
+        if np.any(arrivals < 0) or np.any(services < 0):
+            raise ValueError("Negative interarrival or service time in the trace (timestamps not sorted?)")
+        yield arrivals, services
+
+def replay(blocks):
+    """
+    Run the queue on (interarrivals, services) blocks.
+    Returns the metric dict of run_simulation plus the trace statistics.
+    """
+    response = 0.0
+    sums = []
+    moments = np.zeros(4)  # Σa, Σa², Σs, Σs²
+    for interarrivals, services in blocks:
+        if len(interarrivals) == 0:
+            continue
+        waits = block_waits(interarrivals, services, response)
+        response = waits[-1] + services[-1]
+        sums.append((len(interarrivals), interarrivals.sum(), waits.sum(), services.sum()))
+        moments += (interarrivals.sum(), np.dot(interarrivals, interarrivals),
+                    services.sum(), np.dot(services, services))
+    if not sums:
+        raise ValueError("Empty trace")
+
+    results = summarize(sums, float(response))
+    n = results["num_customers_served"]
+    mean_interarrival, mean_service = float(moments[0] / n), float(moments[2] / n)
+    results["trace"] = {
+        "arrival_rate": 1 / mean_interarrival,
+        "service_rate": 1 / mean_service,
+        "utilization": mean_service / mean_interarrival,
+        "interarrival_cv_squared": float(moments[1] / n) / mean_interarrival**2 - 1,
+        "service_cv_squared": float(moments[3] / n) / mean_service**2 - 1,
+    }
+    return results
+
+def compare_to_theory(results):
+    """
+    Predicted waits for the measured λ, E[S] and cv² of the services, and the
+    relative deviation of the simulated wait from each prediction.
+    None when the measured load is unstable (ρ >= 1).
+    """
+    trace = results["trace"]
+    lambda_value, mu = trace["arrival_rate"], trace["service_rate"]
+    predictions = {}
+    for name, predict in [
+        ("mm1", lambda: load_theory("mm1").mm1_queue(lambda_value, mu)),
+        ("pollaczek_khinchine", lambda: load_theory("mg1").mg1_theoretical(lambda_value, mu, trace["service_cv_squared"])),
+    ]:
+        try:
+            predicted = predict()["avg_wait_time"]
+        except ValueError:
+            predictions[name] = None
+            continue
+        predictions[name] = {
+            "avg_wait_time": predicted,
+            "relative_deviation": (results["avg_wait"] - predicted) / predicted if predicted else None,
+        }
+    return predictions
+
+def run_trace(path, arrival_column="interarrival", service_column="service", timestamps=False,
+              block_size=DEFAULT_BLOCK_SIZE):
+    """Replay a trace file and compare it with the M/M/1 and P-K predictions."""
+    results = replay(trace_blocks(path, arrival_column, service_column, timestamps, block_size))
+    results["predictions"] = compare_to_theory(results)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded arrival/service trace through the queue.")
+    parser.add_argument("path", help=".npy or .arrow/.feather trace file")
+    parser.add_argument("--arrival-column", default="interarrival", help="column of interarrival times (or timestamps)")
+    parser.add_argument("--service-column", default="service", help="column of service times")
+    parser.add_argument("--timestamps", action="store_true", help="the arrival column holds absolute arrival times")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="customers read per block")
+    args = parser.parse_args(argv)
+
+    results = run_trace(args.path, args.arrival_column, args.service_column, args.timestamps, args.block_size)
+    trace = results["trace"]
+    print(f"\nTrace: {results['num_customers_served']} customers, λ={trace['arrival_rate']:.4f}, "
+          f"μ={trace['service_rate']:.4f}, ρ={trace['utilization']:.4f}, "
+          f"cv²(arrivals)={trace['interarrival_cv_squared']:.3f}, cv²(service)={trace['service_cv_squared']:.3f}")
+    print(f"Average wait time: {results['avg_wait']:.4f} (± {results['wait_margin']:.4f})")
+    print(f"Average queue length: {results['avg_queue_length']:.4f}")
+    print(f"Server utilization: {results['avg_utilization']:.4f}")
+    print(f"Average response time: {results['avg_response']:.4f} (± {results['response_margin']:.4f})")
+    for name, prediction in results["predictions"].items():
+        if prediction is None:
+            print(f"{name}: no prediction (ρ >= 1)")
+        else:
+            print(f"{name}: predicted wait {prediction['avg_wait_time']:.4f}, "
+                  f"deviation {100 * prediction['relative_deviation']:+.1f}%")
+
+if __name__ == "__main__":
+    main()
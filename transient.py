@@ -0,0 +1,170 @@
+"""
+Transient behaviour after a cold start or a load spike, over many replications.
+
+run_simulation only gives long-run averages. Here R independent short
+replications are the rows of NumPy arrays and advance together, block of
+customers by block of customers, with the Lindley recursion of lindley.py
+(which broadcasts over leading axes). A replication starts empty (cold
+start) or with initial_customers customers present at time 0 (the backlog
+left by a load spike), and runs until its arrivals pass the horizon.
+
+The curves are computed on num_bins bins of [0, horizon]:
+    avg_queue_length, avg_in_system  time average of Nq(t) / N(t) over each bin
+    avg_wait                         mean wait of the customers arriving in each bin
+each with a pointwise 95% margin over the replications.
+
+Time averages are exact: with FIFO service the arrival times, the service
+start times and the departure times are all sorted, so the area under Nq
+or N up to any time e is obtained from prefix sums and a binary search.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from lindley import block_waits
+from models import MODELS
+from samplers import model_samplers
+
+def interval_areas(starts, ends, edges):
+    """
+    Area ∫_0^e #{k: starts_k <= t < ends_k} dt at every edge e, for every row.
+    starts and ends are nondecreasing along each row. Returns shape (rows, edges).
+    """
+    rows, size = starts.shape
+    top = edges[-1] + 1.0  # values beyond the last edge are clipped here
+    step = top + 1.0  # rows are laid out one after the other on a single sorted axis
+    offsets = step * np.arange(rows)[:, np.newaxis]
+    starts = np.minimum(starts, top)
+    ends = np.minimum(ends, top)
+    queries = edges + offsets
+    counts_started = np.searchsorted((starts + offsets).ravel(), queries, side="right")
+    counts_ended = np.searchsorted((ends + offsets).ravel(), queries, side="right")
+    prefix_starts = np.concatenate(([0.0], np.cumsum(starts.ravel())))
+    prefix_ends = np.concatenate(([0.0], np.cumsum(ends.ravel())))
+    row_base = size * np.arange(rows)[:, np.newaxis]
+    # Intervals started by e contribute min(e, end) - start
+    return ((prefix_ends[counts_ended] - prefix_ends[row_base])
+            + (counts_started - counts_ended) * edges
+            - (prefix_starts[counts_started] - prefix_starts[row_base]))
+
+def binned_sums(values, times, edges):
+    """Per-row sums and counts of values whose time falls in each bin."""
+    rows, _ = values.shape
+    num_bins = len(edges) - 1
+    bins = np.searchsorted(edges, times, side="right") - 1
+    inside = (bins >= 0) & (bins < num_bins)
+    index = (np.arange(rows)[:, np.newaxis] * num_bins + bins)[inside]
+    sums = np.bincount(index, weights=values[inside], minlength=rows * num_bins)
+    counts = np.bincount(index, minlength=rows * num_bins)
+    return sums.reshape(rows, num_bins), counts.reshape(rows, num_bins)
+
+def pointwise_mean(samples):
+    """Mean over the replications (rows) and 95% half-width, per column."""
+    replications = len(samples)
+    margin = 1.96 * samples.std(axis=0, ddof=1) / math.sqrt(replications) if replications > 1 else 0.0 * samples[0]
+    return samples.mean(axis=0), margin
+
+def pointwise_ratio(sums, counts):
+    """Ratio Σ sums / Σ counts per column and its 95% half-width (delta method over the rows)."""
+    replications = len(sums)
+    total_counts = counts.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = sums.sum(axis=0) / total_counts
+        residuals = sums - ratio * counts
+        margin = (1.96 * residuals.std(axis=0, ddof=1) / math.sqrt(replications)
+                  / (total_counts / replications)) if replications > 1 else 0.0 * ratio
+    return ratio, margin
+
+def run_transient(model, lambda_value, service_rate=1.0, horizon=100.0, num_bins=50, replications=1000,
+                  seed=None, initial_customers=0, cv_squared=9.0, block_size=None):
+    """
+    Simulate `replications` independent runs of a model over [0, horizon].
+    initial_customers: customers in the system at time 0 (0 = cold start)
+    Returns the bin edges and the mean curves with their margins (arrays of num_bins values).
+    """
+    sample_interarrivals, sample_services = model_samplers(model, lambda_value, service_rate, cv_squared)
+    rng = np.random.default_rng(seed)
+    edges = np.linspace(0.0, horizon, num_bins + 1)
+    if block_size is None:
+        # About all the arrivals of the horizon in one block, within ~8 MB per array
+        block_size = max(16, min(math.ceil(1.2 * lambda_value * horizon) + 16, 2**20 // replications))
+
+    queue_area = np.zeros((replications, num_bins + 1))
+    system_area = np.zeros((replications, num_bins + 1))
+    wait_sums = np.zeros((replications, num_bins))
+    wait_counts = np.zeros((replications, num_bins))
+
+    # Initial backlog: customers arrived at time 0, served one after the other
+    clock = np.zeros(replications)  # arrival time of the last customer
+    response = np.zeros(replications)  # response time of the last customer
+    if initial_customers:
+        services = sample_services(rng, (replications, initial_customers))
+        departures = np.cumsum(services, axis=1)
+        zeros = np.zeros_like(departures)
+        queue_area += interval_areas(zeros, departures - services, edges)
+        system_area += interval_areas(zeros, departures, edges)
+        response = departures[:, -1]
+
+    while clock.min() <= horizon:
+        interarrivals = sample_interarrivals(rng, (replications, block_size))
+        services = sample_services(rng, (replications, block_size))
+        arrivals = np.cumsum(interarrivals, axis=1)
+        arrivals += clock[:, np.newaxis]
+        waits = block_waits(interarrivals, services, response)
+        starts = arrivals + waits
+        departures = starts + services
+        queue_area += interval_areas(arrivals, starts, edges)
+        system_area += interval_areas(arrivals, departures, edges)
+        sums, counts = binned_sums(waits, arrivals, edges)
+        wait_sums += sums
+        wait_counts += counts
+        clock = arrivals[:, -1]
+        response = waits[:, -1] + services[:, -1]
+
+    widths = np.diff(edges)
+    avg_queue_length, queue_length_margin = pointwise_mean(np.diff(queue_area, axis=1) / widths)
+    avg_in_system, system_margin = pointwise_mean(np.diff(system_area, axis=1) / widths)
+    avg_wait, wait_margin = pointwise_ratio(wait_sums, wait_counts)
+    return {
+        "replications": replications,
+        "bin_edges": edges,
+        "avg_queue_length": avg_queue_length,
+        "queue_length_margin": queue_length_margin,
+        "avg_in_system": avg_in_system,
+        "system_margin": system_margin,
+        "avg_wait": avg_wait,
+        "wait_margin": wait_margin,
+        "arrivals_per_replication": wait_counts.sum(axis=0) / replications,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transient queue behaviour averaged over many replications.")
+    parser.add_argument("--model", choices=list(MODELS), default="mm1")
+    parser.add_argument("--lambda", dest="lambda_value", type=float, default=0.9, help="arrival rate λ")
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--horizon", type=float, default=100.0, help="simulated time after the start")
+    parser.add_argument("--bins", type=int, default=20, help="number of time bins")
+    parser.add_argument("--replications", type=int, default=1000, help="independent replications")
+    parser.add_argument("--initial", type=int, default=0, help="customers present at time 0 (load spike)")
+    parser.add_argument("--cv2", type=float, default=9.0, help="squared coefficient of variation of the hyperexponential times")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_transient(args.model, args.lambda_value, args.mu, args.horizon, args.bins, args.replications,
+                            args.seed, args.initial, args.cv2)
+    wall_time = time.perf_counter() - start
+    print(f"\n{args.model} with λ={args.lambda_value}, μ={args.mu}: {args.replications} replications "
+          f"of [0, {args.horizon}] in {wall_time:.2f} s")
+    print(f"{'t':>16}  {'E[Lq]':>17}  {'E[L]':>17}  {'E[Wq]':>17}")
+    edges = results["bin_edges"]
+    for b in range(args.bins):
+        print(f"[{edges[b]:6.1f}, {edges[b + 1]:6.1f})  "
+              f"{results['avg_queue_length'][b]:8.4f} ± {results['queue_length_margin'][b]:6.4f}  "
+              f"{results['avg_in_system'][b]:8.4f} ± {results['system_margin'][b]:6.4f}  "
+              f"{results['avg_wait'][b]:8.4f} ± {results['wait_margin'][b]:6.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Automated check of the simulators against the theoretical values.
+
+For every model and λ of the grid, an engine of benchmark.py runs R short
+independent replications (seeds seed, seed + 1, ...), and every metric is
+compared with mm1_queue, mg1_theoretical or gm1_theoretical_hyperexp by a
+t-test on the replication means:
+    t = (mean - theory) / (s / √R)
+The spread between replications is used instead of the margins reported by
+the engines, so that every engine is judged the same way (the margins of
+run_simulation ignore the correlation between successive customers).
+The critical value is Bonferroni-corrected for the number of tests, so that
+a correct engine fails the whole grid with probability at most alpha.
+
+Short runs start empty and are biased low at high load. The default
+numbers of customers (fewer for the much slower event loop, so that the
+default grid runs in under a minute) keep this bias well below the noise
+of the test up to λ = 0.9.
+
+Usage:
+    python validate.py                                   # event and lindley engines, full grid
+    python validate.py --engines parallel --customers 100000
+The script exits with status 1 if any deviation is significant.
+"""
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+from scipy import stats
+
+from benchmark import ENGINES
+from grid import DEFAULT_LAMBDAS
+from models import MODELS, load_theory
+
+DEFAULT_ENGINES = ("event", "lindley")
+# Customers per replication of each engine (DEFAULT_CUSTOMERS for the others)
+ENGINE_CUSTOMERS = {"event": 30000}
+DEFAULT_CUSTOMERS = 200000
+
+# Simulated metric -> theoretical metric
+METRICS = {
+    "avg_wait": "avg_wait_time",
+    "avg_response": "avg_response_time",
+    "avg_queue_length": "avg_queue_length",
+    "avg_utilization": "utilization",
+}
+
+def model_theory(model, lambda_value, service_rate=1.0, cv_squared=9.0):
+    """Theoretical metrics of a model (same keys for the three models)."""
+    theory = load_theory(model)
+    if model == "mm1":
+        return theory.mm1_queue(lambda_value, service_rate)
+    if model == "mg1":
+        return theory.mg1_theoretical(lambda_value, service_rate, cv_squared)
+    return theory.gm1_theoretical_hyperexp(lambda_value, service_rate, cv_squared=cv_squared)
+
+def compare(samples, expected, critical):
+    """t statistic of the replication means against the expected value, and whether it is significant."""
+    samples = np.asarray(samples, dtype=float)
+    mean = float(samples.mean())
+    standard_error = float(samples.std(ddof=1)) / math.sqrt(len(samples))
+    if standard_error == 0:
+        statistic = 0.0 if math.isclose(mean, expected) else math.inf
+    else:
+        statistic = (mean - expected) / standard_error
+    return {
+        "simulated": mean,
+        "theory": expected,
+        "margin": critical * standard_error,
+        "t": statistic,
+        "significant": abs(statistic) > critical,
+    }
+
+def validate_point(engine, model, lambda_value, service_rate=1.0, num_customers=200000, replications=20,
+                   seed=0, critical=None):
+    """
+    Run `replications` replications of one (engine, model, λ) point and
+    compare every metric with the theory. critical: threshold of |t|
+    (default: two-sided 5% with R - 1 degrees of freedom)
+    """
+    if replications < 2:
+        raise ValueError("At least 2 replications are needed to estimate the spread")
+    if critical is None:
+        critical = float(stats.t.ppf(0.975, replications - 1))
+    run = ENGINES[engine]
+    runs = [run(model, lambda_value, service_rate, num_customers, seed + r) for r in range(replications)]
+    theory = model_theory(model, lambda_value, service_rate)
+    return {metric: compare([results[metric] for results in runs], theory[key], critical)
+            for metric, key in METRICS.items()}
+
+def run_validation(engines=DEFAULT_ENGINES, models=tuple(MODELS), lambdas=DEFAULT_LAMBDAS, service_rate=1.0,
+                   num_customers=None, replications=20, seed=0, alpha=0.01):
+    """
+    Validate every (engine, model, λ) point. Returns one row per point
+    (engine, model, lambda, num_customers, metrics, wall_time) and the critical |t|.
+    num_customers: customers per replication (default: ENGINE_CUSTOMERS, or DEFAULT_CUSTOMERS)
+    """
+    num_tests = len(engines) * len(models) * len(lambdas) * len(METRICS)
+    critical = float(stats.t.ppf(1 - alpha / (2 * num_tests), replications - 1))
+    rows = []
+    for engine in engines:
+        customers = num_customers or ENGINE_CUSTOMERS.get(engine, DEFAULT_CUSTOMERS)
+        for model in models:
+            for lambda_value in lambdas:
+                start = time.perf_counter()
+                metrics = validate_point(engine, model, lambda_value, service_rate, customers, replications,
+                                         seed, critical)
+                rows.append({
+                    "engine": engine,
+                    "model": model,
+                    "lambda": lambda_value,
+                    "num_customers": customers,
+                    "metrics": metrics,
+                    "wall_time": time.perf_counter() - start,
+                })
+    return rows, critical
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the simulators against the theoretical values.")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(DEFAULT_ENGINES))
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--lambdas", nargs="+", type=float, default=DEFAULT_LAMBDAS)
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--customers", type=int, default=None,
+                        help=f"customers per replication (default: {DEFAULT_CUSTOMERS}, "
+                             f"{ENGINE_CUSTOMERS['event']} for the event engine)")
+    parser.add_argument("--replications", type=int, default=20, help="independent replications per point")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first replication")
+    parser.add_argument("--alpha", type=float, default=0.01,
+                        help="probability that a correct engine fails the whole grid")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows, critical = run_validation(args.engines, args.models, args.lambdas, args.mu, args.customers,
+                                    args.replications, args.seed, args.alpha)
+    failures = 0
+    print(f"{'engine':<18} {'model':<5} {'λ':>5}  " + "  ".join(f"{metric:>26}" for metric in METRICS) + "  status")
+    for row in rows:
+        cells = []
+        flagged = []
+        for metric, comparison in row["metrics"].items():
+            cells.append(f"{comparison['simulated']:9.4f} vs {comparison['theory']:8.4f} t={comparison['t']:+5.1f}")
+            if comparison["significant"]:
+                flagged.append(metric)
+        failures += bool(flagged)
+        status = "DEVIATION: " + ", ".join(flagged) if flagged else "ok"
+        print(f"{row['engine']:<18} {row['model']:<5} {row['lambda']:5.2f}  " + "  ".join(cells) + f"  {status}")
+    print(f"\n{len(rows)} points in {time.perf_counter() - start:.1f} s, |t| > {critical:.2f} is significant "
+          f"(Bonferroni, alpha={args.alpha}): {failures} deviation(s)")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
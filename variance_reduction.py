@@ -0,0 +1,214 @@
+"""
+Variance reduction for replicated runs: antithetic variates and randomised
+quasi-Monte Carlo (Sobol).
+
+exp_rv and hyperx turn uniforms into variates by inversion
+(-mean * log(U), and a uniform for the phase of the H2). The schemes below
+need to see all the replications at once (pairs of rows, or the points of
+one Sobol set), which a sampler drawing the variates of a single run
+cannot do: they are therefore not plugged behind exp_rv/hyperx or
+samplers.py, but come with their own replication engine. Here R
+replications of a model are the rows of NumPy arrays (as in transient.py).
+Their uniforms come from one of three schemes:
+
+* "independent": plain pseudo-random uniforms;
+* "antithetic": replications in pairs, the second one driven by 1 - U
+  where the first uses U. Waits are monotone in the service and
+  interarrival times, so the two paths are negatively correlated;
+* "sobol": for every block of customers, the replications are the points
+  of a Sobol set over all the uniforms of the block, randomised by a
+  random digital shift, with the rows permuted between blocks (Latin supercube sampling: the dimension of
+  a whole path is far beyond what a single Sobol set covers).
+
+Each scheme has its own correct confidence interval: a t interval over the
+independent groups of the scheme (single replications, antithetic pairs,
+or independent randomisations of the Sobol sets, each estimating the
+mean over its own points).
+
+On long steady-state runs the mean wait is a very nonlinear function of
+the path, and neither scheme gains much. The per-replication means of the
+service and interarrival times have known expectations and are strongly
+correlated with it, so estimate(..., controls=...) also offers control
+variates (regression of the group means on them, t interval on the
+intercept), which roughly halve the variance with any scheme.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+from scipy import stats
+from scipy.stats import qmc
+
+from lindley import block_sizes, block_waits
+from samplers import MODEL_DISTRIBUTIONS, hyperexponential_probability
+
+SCHEMES = ("independent", "antithetic", "sobol")
+
+def group_sizes(scheme, replications, randomizations=8):
+    """Number of independent groups of replications of a scheme (the degrees of freedom + 1 of its CI)."""
+    if scheme == "independent":
+        return replications
+    if scheme == "antithetic":
+        if replications % 2:
+            raise ValueError("Antithetic replications come in pairs: use an even number")
+        return replications // 2
+    if scheme == "sobol":
+        points = replications // randomizations
+        if replications % randomizations or points & (points - 1):
+            raise ValueError("Sobol replications must be randomizations x a power of 2 points")
+        return randomizations
+    raise ValueError(f"Unknown scheme: {scheme} (expected one of {', '.join(SCHEMES)})")
+
+def sobol_points(points, dimension):
+    """First `points` unscrambled Sobol points as 32-bit integers, shape (points, dimension)."""
+    return (qmc.Sobol(dimension, scramble=False).random(points) * 2**32).astype(np.uint64)
+
+def uniform_block(scheme, replications, dimension, rng, randomizations=8, sobol=None):
+    """
+    (replications, dimension) uniforms in (0, 1) for one block of customers.
+    sobol: the points of sobol_points(replications // randomizations, dimension),
+    randomised here by a random digital shift (XOR) and a row permutation per set
+    """
+    if scheme == "independent":
+        uniforms = rng.random((replications, dimension))
+    elif scheme == "antithetic":
+        half = rng.random((replications // 2, dimension))
+        uniforms = np.concatenate([half, 1.0 - half])  # replication i is paired with i + R/2
+    else:
+        points = replications // randomizations
+        sets = []
+        for _ in range(randomizations):
+            shift = rng.integers(0, 2**32, dimension, dtype=np.uint64)
+            sets.append((sobol ^ shift)[rng.permutation(points)])
+        uniforms = (np.concatenate(sets) + 0.5) / 2**32
+    return np.clip(uniforms, 1e-300, 1.0)  # log(U) must be finite
+
+def _variates(kind, uniforms, mean, cv_squared):
+    """Exponential (one uniform per variate) or Morse's H2 (phase uniform, then exponential) by inversion."""
+    if kind == "exponential":
+        return -mean * np.log(uniforms)
+    phase, exponential = uniforms[..., 0::2], uniforms[..., 1::2]
+    p = hyperexponential_probability(cv_squared)
+    scale = np.where(phase > p, mean / (1.0 - p), mean / p)
+    return -0.5 * scale * np.log(exponential)
+
+def run_replications(model, lambda_value, service_rate=1.0, num_customers=100000, replications=64,
+                     scheme="independent", seed=None, cv_squared=9.0, randomizations=8, block_size=1024):
+    """
+    Simulate `replications` runs of a model from an empty system, driven by
+    the uniforms of `scheme`. Returns per-replication arrays of the
+    metrics of run_simulation (avg_wait, avg_response, avg_queue_length,
+    avg_utilization) and the controls (replications, 2) for estimate: the
+    mean service and interarrival times minus their expectations.
+    """
+    group_sizes(scheme, replications, randomizations)
+    arrival_kind, service_kind = MODEL_DISTRIBUTIONS[model]
+    arrival_uniforms = 1 if arrival_kind == "exponential" else 2
+    service_uniforms = 1 if service_kind == "exponential" else 2
+    rng = np.random.default_rng(seed)
+    sobol = None
+
+    responses = np.zeros(replications)
+    arrival_time = np.zeros(replications)
+    total_wait = np.zeros(replications)
+    total_service = np.zeros(replications)
+    for size in block_sizes(num_customers, block_size):
+        dimension = size * (arrival_uniforms + service_uniforms)
+        if scheme == "sobol" and (sobol is None or sobol.shape[1] != dimension):
+            sobol = sobol_points(replications // randomizations, dimension)
+        uniforms = uniform_block(scheme, replications, dimension, rng, randomizations, sobol)
+        split = size * arrival_uniforms
+        interarrivals = _variates(arrival_kind, uniforms[:, :split], 1 / lambda_value, cv_squared)
+        services = _variates(service_kind, uniforms[:, split:], 1 / service_rate, cv_squared)
+        waits = block_waits(interarrivals, services, responses)
+        responses = waits[:, -1] + services[:, -1]
+        arrival_time += interarrivals.sum(axis=1)
+        total_wait += waits.sum(axis=1)
+        total_service += services.sum(axis=1)
+
+    time_total = arrival_time + responses
+    return {
+        "avg_wait": total_wait / num_customers,
+        "avg_response": (total_wait + total_service) / num_customers,
+        "avg_queue_length": total_wait / time_total,
+        "avg_utilization": total_service / time_total,
+        "controls": np.column_stack([total_service / num_customers - 1 / service_rate,
+                                     arrival_time / num_customers - 1 / lambda_value]),
+    }
+
+def _group_means(values, scheme, groups):
+    """Means of per-replication values (along the first axis) over the independent groups of a scheme."""
+    if scheme == "antithetic":
+        return 0.5 * (values[:groups] + values[groups:])
+    return values.reshape(groups, -1, *values.shape[1:]).mean(axis=1)
+
+def estimate(samples, scheme, randomizations=8, confidence=0.95, controls=None):
+    """
+    Mean of per-replication samples and its margin for the scheme: t interval
+    over the independent groups (replications, antithetic pairs or Sobol randomisations).
+    controls: optional (replications, k) values of expectation 0 (the
+    "controls" of run_replications). The estimate is then the intercept of
+    the least-squares regression of the group means on the controls.
+    """
+    samples = np.asarray(samples, dtype=float)
+    groups = group_sizes(scheme, len(samples), randomizations)
+    group_means = _group_means(samples, scheme, groups)
+    if controls is None:
+        if groups < 2:
+            return float(group_means.mean()), math.inf
+        quantile = float(stats.t.ppf(0.5 + confidence / 2, groups - 1))
+        return float(group_means.mean()), quantile * float(group_means.std(ddof=1)) / math.sqrt(groups)
+
+    design = np.column_stack([np.ones(groups), _group_means(np.asarray(controls, dtype=float), scheme, groups)])
+    degrees_of_freedom = groups - design.shape[1]
+    coefficients = np.linalg.lstsq(design, group_means, rcond=None)[0]
+    if degrees_of_freedom < 1:
+        return float(coefficients[0]), math.inf
+    residuals = group_means - design @ coefficients
+    variance = residuals @ residuals / degrees_of_freedom * np.linalg.inv(design.T @ design)[0, 0]
+    quantile = float(stats.t.ppf(0.5 + confidence / 2, degrees_of_freedom))
+    return float(coefficients[0]), quantile * math.sqrt(variance)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare independent, antithetic and Sobol replications.")
+    parser.add_argument("--model", choices=list(MODEL_DISTRIBUTIONS), default="mm1")
+    parser.add_argument("--lambdas", nargs="+", type=float, default=[0.3, 0.5, 0.7, 0.9])
+    parser.add_argument("--mu", type=float, default=1.0, help="service rate μ")
+    parser.add_argument("--customers", type=int, default=20000, help="customers per replication")
+    parser.add_argument("--replications", type=int, default=64)
+    parser.add_argument("--randomizations", type=int, default=8, help="independent Sobol scramblings")
+    parser.add_argument("--trials", type=int, default=10, help="repetitions to measure the true variance")
+    parser.add_argument("--cv2", type=float, default=9.0, help="squared coefficient of variation of the hyperexponential times")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    print(f"{args.model}: {args.replications} replications of {args.customers} customers, "
+          f"avg_wait estimate over {args.trials} trials")
+    print(f"{'λ':>5}  {'scheme':<22} {'mean':>9} {'margin':>9} {'variance':>11} {'gain':>6} {'time':>6}")
+    for lambda_value in args.lambdas:
+        baseline = None
+        for scheme in SCHEMES:
+            start = time.perf_counter()
+            estimates = {False: [], True: []}
+            margins = {False: [], True: []}
+            for trial in range(args.trials):
+                results = run_replications(args.model, lambda_value, args.mu, args.customers, args.replications,
+                                           scheme, args.seed + trial, args.cv2, args.randomizations)
+                for controlled in (False, True):
+                    value, margin = estimate(results["avg_wait"], scheme, args.randomizations,
+                                             controls=results["controls"] if controlled else None)
+                    estimates[controlled].append(value)
+                    margins[controlled].append(margin)
+            wall_time = (time.perf_counter() - start) / args.trials
+            for controlled in (False, True):
+                variance = float(np.var(estimates[controlled], ddof=1))
+                baseline = baseline or variance
+                # gain: replications of the plain independent scheme needed for the same precision, per replication here
+                label = scheme + (" + controls" if controlled else "")
+                print(f"{lambda_value:5.2f}  {label:<22} {np.mean(estimates[controlled]):9.4f} "
+                      f"{np.mean(margins[controlled]):9.4f} {variance:11.3e} {baseline / variance:6.2f} "
+                      f"{wall_time:5.2f}s")
+
+if __name__ == "__main__":
+    main()